@@ -1,4 +1,5 @@
 from .hom import *
 from .nested_hilbert_scheme import *
+from .sweep import *
 
 init_globals()
@@ -0,0 +1,279 @@
+from __future__ import annotations
+from .groebner_polynomial import *
+from dataclasses import dataclass
+import heapq
+
+
+@dataclass
+class BuchbergerStats:
+    pairs_created: int = 0
+    pruned_product: int = 0     # coprime leading monomials (Buchberger's first criterion)
+    pruned_chain: int = 0       # chain criterion (Gebauer-Möller)
+    reduced: int = 0            # S-polynomials actually reduced
+    reduced_to_zero: int = 0
+
+    @property
+    def pairs_pruned(self) -> int:
+        return self.pruned_product + self.pruned_chain
+
+    def __repr__(self):
+        return (
+            f"pairs created: {self.pairs_created}, "
+            f"pruned: {self.pairs_pruned} (product: {self.pruned_product}, chain: {self.pruned_chain}), "
+            f"reduced: {self.reduced}, reduced to zero: {self.reduced_to_zero}"
+        )
+
+
+class CriticalPair:
+    __slots__ = ("i", "j", "lcm", "sugar", "removed")
+
+    def __init__(self, i: int, j: int, lcm: Monomial, sugar: int):
+        self.i = i
+        self.j = j
+        self.lcm = lcm
+        self.sugar = sugar
+        self.removed = False    # pairs discarded by the chain criterion stay in the heap until popped
+
+
+class PairQueue:
+    """
+    Critical pairs waiting to be reduced, popped according to a selection strategy:
+    - "normal": smallest lcm for the monomial order first,
+    - "sugar": smallest sugar degree first, then smallest lcm.
+    """
+    STRATEGIES = ("normal", "sugar")
+
+    def __init__(self, order: MonomialOrder, strategy: str = "sugar"):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"unknown pair selection strategy '{strategy}', expected one of {self.STRATEGIES}")
+        self.order = order
+        self.strategy = strategy
+        self._heap = []
+        self._count = 0     # insertion counter, breaks ties between pairs
+        self._alive = 0
+
+    def push(self, pair: CriticalPair):
+        lcm_key = self.order.key(pair.lcm)
+        priority = (pair.sugar, lcm_key) if self.strategy == "sugar" else (lcm_key,)
+        heapq.heappush(self._heap, (priority, self._count, pair))
+        self._count += 1
+        self._alive += 1
+
+    def pop(self) -> CriticalPair:
+        while self._heap:
+            _, _, pair = heapq.heappop(self._heap)
+            if not pair.removed:
+                self._alive -= 1
+                return pair
+        raise IndexError("pop from an empty pair queue")
+
+    def peek(self) -> CriticalPair:
+        while self._heap and self._heap[0][2].removed:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            raise IndexError("peek into an empty pair queue")
+        return self._heap[0][2]
+
+    def remove(self, pair: CriticalPair):
+        pair.removed = True
+        self._alive -= 1
+
+    def pairs(self) -> Iterator[CriticalPair]:
+        return (pair for _, _, pair in self._heap if not pair.removed)
+
+    def __len__(self):
+        return self._alive
+
+
+class Buchberger:
+    """
+    Buchberger's algorithm with a critical pair queue.
+    Pairs are filtered with the Gebauer-Möller installation of Buchberger's criteria when each new
+    polynomial is added to the basis, and selected with the normal or the sugar strategy.
+    product_criterion: drop the pairs of coprime leading monomials. Their S-polynomials reduce to zero,
+    but their syzygies (the Koszul ones) are not combinations of the others: it must be off to collect syzygies
+    """
+
+    def __init__(self, order: MonomialOrder, strategy: str = "sugar", stats: BuchbergerStats = None, product_criterion: bool = True):
+        self.order = order
+        self.product_criterion = product_criterion
+        self.queue = PairQueue(order, strategy)
+        self.stats = stats if stats is not None else BuchbergerStats()
+        self.polys: List[GroebnerPolynomial] = []   # every polynomial ever added, indices never change
+        self.sugars: List[int] = []
+        self.active: List[int] = []     # indices of the current basis
+
+    @staticmethod
+    def sugar_degree(f: GroebnerPolynomial) -> int:
+        return max(m.total_degree() for _, m in f.terms())
+
+    def basis(self) -> List[GroebnerPolynomial]:
+        return [self.polys[i] for i in self.active]
+
+    def add(self, f: GroebnerPolynomial, sugar: int = None):
+        """add f to the basis, creating the critical pairs it forms with the current basis (f must be nonzero)"""
+        if sugar is None:
+            sugar = self.sugar_degree(f)
+        t = len(self.polys)
+        self.polys.append(f)
+        self.sugars.append(sugar)
+        self._update(t)
+
+    def add_generator(self, f: GroebnerPolynomial):
+        """reduce f by the current basis first, and only add it if it does not reduce to zero"""
+        if f.is_zero():
+            return
+        f, sugar = self.reduce(f, self.sugar_degree(f))
+        if not f.is_zero():
+            self.add(f, sugar)
+
+    def add_groebner_basis(self, G: List[GroebnerPolynomial]):
+        """
+        seed the basis with the elements of a Groebner basis (whose leading monomials do not divide each other):
+        their critical pairs are known to reduce to zero, so they are never formed
+        """
+        for g in G:
+            self.polys.append(g)
+            self.sugars.append(self.sugar_degree(g))
+            self.active.append(len(self.polys)-1)
+
+    def _pair(self, i: int, j: int) -> CriticalPair:
+        lm_i, lm_j = self.polys[i].lm, self.polys[j].lm
+        lcm = lm_i.lcm(lm_j)
+        degree = lcm.total_degree()
+        sugar = max(self.sugars[i] + degree - lm_i.total_degree(), self.sugars[j] + degree - lm_j.total_degree())
+        return CriticalPair(i, j, lcm, sugar)
+
+    def _update(self, t: int):
+        h_lm = self.polys[t].lm
+        new_pairs = [self._pair(i, t) for i in self.active]
+        self.stats.pairs_created += len(new_pairs)
+
+        # among the new pairs, keep a single one per divisibility chain of lcms (coprime pairs are kept for now)
+        kept: List[CriticalPair] = []
+        for ind, pair in enumerate(new_pairs):
+            coprime = pair.lcm.total_degree() == self.polys[pair.i].lm.total_degree() + h_lm.total_degree()
+            if coprime:
+                kept.append(pair)
+            elif any(pair.lcm.is_multiple(other.lcm) for other in new_pairs[ind+1:]) or any(pair.lcm.is_multiple(other.lcm) for other in kept):
+                self.stats.pruned_chain += 1
+            else:
+                kept.append(pair)
+
+        # then drop the coprime ones (product criterion)
+        new_pairs = []
+        for pair in kept:
+            if self.product_criterion and pair.lcm.total_degree() == self.polys[pair.i].lm.total_degree() + h_lm.total_degree():
+                self.stats.pruned_product += 1
+            else:
+                new_pairs.append(pair)
+
+        # old pairs whose lcm is strictly divisible by the new leading monomial are redundant
+        for pair in list(self.queue.pairs()):
+            if pair.lcm.is_multiple(h_lm):
+                lm_i, lm_j = self.polys[pair.i].lm, self.polys[pair.j].lm
+                if lm_i.lcm(h_lm) != pair.lcm and lm_j.lcm(h_lm) != pair.lcm:
+                    self.queue.remove(pair)
+                    self.stats.pruned_chain += 1
+
+        for pair in new_pairs:
+            self.queue.push(pair)
+        self.active = [i for i in self.active if not self.polys[i].lm.is_multiple(h_lm)]
+        self.active.append(t)
+
+    def s_polynomial(self, pair: CriticalPair) -> GroebnerPolynomial:
+        f, g = self.polys[pair.i], self.polys[pair.j]
+        return (f * MonomialWithCoef(1/f.lc, pair.lcm/f.lm)).sub_term_multiple(1/g.lc, pair.lcm/g.lm, g)
+
+    def reduce(self, f: GroebnerPolynomial, sugar: int) -> Tuple[GroebnerPolynomial, int]:
+        """top-reduction of f by the current basis, keeping track of the sugar degree"""
+        while not f.is_zero():
+            f_lm = f.lm
+            for i in self.active:
+                g = self.polys[i]
+                if f_lm.is_multiple(g.lm):
+                    m = f_lm/g.lm
+                    sugar = max(sugar, m.total_degree() + self.sugars[i])
+                    f = f.sub_term_multiple(f.lc/g.lc, m, g)
+                    break
+            else:
+                return f, sugar
+        return f, sugar
+
+    def run(self) -> List[GroebnerPolynomial]:
+        while len(self.queue) > 0:
+            pair = self.queue.pop()
+            S, sugar = self.reduce(self.s_polynomial(pair), pair.sugar)
+            self.stats.reduced += 1
+            if S.is_zero():
+                self.stats.reduced_to_zero += 1
+            else:
+                self.add(S, sugar)
+        return self.basis()
+
+
+class CofactorBuchberger(Buchberger):
+    """
+    Buchberger's algorithm keeping, for every polynomial h of the basis, its cofactors: polynomials c with h = sum(c[k]*F[k]),
+    F being the generators in the order they were added. The cofactors of the polynomial being reduced
+    follow each reduction step, the pairs and criteria are those of Buchberger
+    """
+
+    def __init__(self, order: MonomialOrder, strategy: str = "sugar", stats: BuchbergerStats = None):
+        super().__init__(order, strategy=strategy, stats=stats)
+        self.generators: List[GroebnerPolynomial] = []
+        self.cofactors: List[List[GroebnerPolynomial]] = []     # cofactors of each polynomial of self.polys
+        self._current: List[GroebnerPolynomial] = None          # cofactors of the polynomial being reduced
+
+    def _zero(self) -> GroebnerPolynomial:
+        f = self.generators[0]
+        return f._with_terms((), (), ())
+
+    def _padded(self, cofactors: List[GroebnerPolynomial]) -> List[GroebnerPolynomial]:
+        # cofactors of a polynomial added before the last generators, padded with zeros to the current number of generators
+        return cofactors + [self._zero()] * (len(self.generators) - len(cofactors))
+
+    def basis_cofactors(self) -> List[List[GroebnerPolynomial]]:
+        """cofactors of the elements of basis(), padded with zeros to the current number of generators"""
+        return [self._padded(self.cofactors[i]) for i in self.active]
+
+    def add(self, f: GroebnerPolynomial, sugar: int = None):
+        self.cofactors.append(self._current)
+        super().add(f, sugar)
+
+    def add_generator(self, f: GroebnerPolynomial):
+        k = len(self.generators)
+        self.generators.append(f)
+        one = GroebnerPolynomial([MonomialWithCoef(1, Monomial.one(f._ctx))], f.symbols, f.order)
+        self._current = [self._zero()]*k + [one]
+        super().add_generator(f)
+
+    def add_groebner_basis(self, G: List[GroebnerPolynomial]):
+        raise NotImplementedError("the cofactors of a known basis are not known")
+
+    def s_polynomial(self, pair: CriticalPair) -> GroebnerPolynomial:
+        f, g = self.polys[pair.i], self.polys[pair.j]
+        cofactors_f, cofactors_g = self._padded(self.cofactors[pair.i]), self.cofactors[pair.j]
+        a = MonomialWithCoef(1/f.lc, pair.lcm/f.lm)
+        self._current = [c*a for c in cofactors_f]
+        for k, c in enumerate(cofactors_g):
+            self._current[k] = self._current[k].sub_term_multiple(1/g.lc, pair.lcm/g.lm, c)
+        return super().s_polynomial(pair)
+
+    def reduce(self, f: GroebnerPolynomial, sugar: int) -> Tuple[GroebnerPolynomial, int]:
+        cofactors = self._padded(list(self._current))
+        while not f.is_zero():
+            f_lm = f.lm
+            for i in self.active:
+                g = self.polys[i]
+                if f_lm.is_multiple(g.lm):
+                    m, c = f_lm/g.lm, f.lc/g.lc
+                    sugar = max(sugar, m.total_degree() + self.sugars[i])
+                    for k, d in enumerate(self.cofactors[i]):
+                        cofactors[k] = cofactors[k].sub_term_multiple(c, m, d)
+                    f = f.sub_term_multiple(c, m, g)
+                    break
+            else:
+                break
+        self._current = cofactors
+        return f, sugar
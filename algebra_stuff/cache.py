@@ -0,0 +1,109 @@
+from __future__ import annotations
+from .groebner_polynomial import *
+from collections import OrderedDict
+from typing import Any, Hashable
+import hashlib
+import os
+import pickle
+
+
+class IdealCache:
+    """
+    Content-addressed cache of data derived from ideals (reduced Groebner basis, standard monomials,
+    multiplication matrices...), keyed by a canonical form of the ring, the monomial order,
+    the scalar mode and the generators of the ideal.
+    Entries are kept in memory with a least recently used eviction policy, and optionally written
+    to a directory so that they survive restarts.
+    Only plain data (exponent tuples, coefficients, arrays) is stored.
+    """
+
+    def __init__(self, maxsize: int = 256, directory: str = None):
+        self.enabled = True
+        self.maxsize = maxsize
+        self.directory = None
+        self._entries: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            self.set_directory(directory)
+
+    def set_directory(self, directory: str = None):
+        """directory of the on-disk store, None to keep the cache in memory only"""
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def clear(self, disk: bool = False):
+        self._entries.clear()
+        if disk and self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def make_key(*parts: Hashable) -> str:
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pkl")
+
+    def _entry(self, key: str, create: bool = False) -> Dict[str, Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), "rb") as file:
+                entry = pickle.load(file)
+        elif not create:
+            return None
+        else:
+            entry = {}
+        self._entries[key] = entry
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def get(self, key: str, field: str) -> Any:
+        if not self.enabled:
+            return None
+        entry = self._entry(key)
+        if entry is None or field not in entry:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[field]
+
+    def set(self, key: str, field: str, value: Any):
+        if not self.enabled:
+            return
+        entry = self._entry(key, create=True)
+        entry[field] = value
+        if self.directory is not None:
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as file:
+                pickle.dump(entry, file)
+            os.replace(tmp_path, self._path(key))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        location = f", stored in {self.directory}" if self.directory is not None else ""
+        return f"IdealCache({len(self)} entries in memory, {self.hits} hits, {self.misses} misses{location})"
+
+
+IDEAL_CACHE = IdealCache()
+
+
+def poly_to_data(f: GroebnerPolynomial) -> Tuple[Tuple[Tuple[int, ...], Scalar], ...]:
+    return tuple((m.degrees, c) for c, m in f.terms())
+
+
+def poly_from_data(data: Tuple[Tuple[Tuple[int, ...], Scalar], ...], symbols: List[Symbol], order: MonomialOrder) -> GroebnerPolynomial:
+    # data comes from a sorted polynomial, no need to sort again
+    ctx = SymbolContext.get(symbols)
+    monoms = tuple(Monomial(ctx, degrees) for degrees, _ in data)
+    keys = tuple(order.key(m) for m in monoms)
+    coefs = tuple(c for _, c in data)
+    return GroebnerPolynomial._from_terms(keys, monoms, coefs, symbols, order, ctx)
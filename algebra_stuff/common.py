@@ -1,11 +1,11 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, List, Dict, Callable
+from typing import TYPE_CHECKING, List, Dict, Tuple, Callable
 from dataclasses import dataclass
 import time
 import random
 import numpy as np
 import scipy
-import sympy
+import scipy.sparse
 from fractions import Fraction
 #import algebra_stuff as alg     # real import
 if TYPE_CHECKING:   # fake import, only for annotations
@@ -153,6 +153,13 @@ def filter_zero(C: np.ndarray):
         return C[np.any(C != 0, axis=1)]
 
 
+def densify(C) -> np.ndarray:
+    """dense version of a constraint matrix, which may be a scipy sparse matrix"""
+    if scipy.sparse.issparse(C):
+        return C.toarray()
+    return C
+
+
 def list_add(l1: list, l2: list):
     return [a+b for a, b in zip(l1, l2)]
 
@@ -180,7 +187,90 @@ def gaussian_elimination(A: np.ndarray, inplace=True):
     return A
 
 
+def reduced_row_echelon(A: np.ndarray, tol: float = 1e-12) -> Tuple[np.ndarray, List[int]]:
+    """
+    put a copy of A in reduced row echelon form, return it with the list of pivot columns.
+    Exact for object arrays (e.g. of Fractions), for floating point arrays entries of absolute value below tol are set to zero
+    """
+    A = np.array(A, copy=True)
+    exact = A.dtype == object
+    n, m = A.shape
+    pivots = []
+    r = 0
+    for c in range(m):
+        if r == n:
+            break
+        if exact:
+            nonzeros = np.nonzero(A[r:, c] != 0)[0]
+            if nonzeros.size == 0:
+                continue
+            p = r + nonzeros[0]
+        else:
+            p = r + np.argmax(np.abs(A[r:, c]))
+            if abs(A[p, c]) <= tol:
+                A[r:, c] = 0
+                continue
+        if p != r:
+            A[[r, p]] = A[[p, r]]
+        A[r] = A[r] / A[r, c]
+        factors = A[:, c].copy()
+        factors[r] = 0
+        to_update = np.nonzero(factors != 0)[0]
+        if to_update.size > 0:
+            updated = A[to_update] - np.outer(factors[to_update], A[r])
+            if not exact:
+                updated[np.abs(updated) <= tol] = 0
+            A[to_update] = updated
+        pivots.append(c)
+        r += 1
+    return A, pivots
+
+
+def solve_lower_triangular(L: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """solve LX = B for L square lower triangular with nonzero diagonal, exactly for object arrays"""
+    if L.dtype != object and B.dtype != object:
+        return scipy.linalg.solve_triangular(L, B, lower=True)
+    X = np.empty(B.shape, dtype=object)
+    for i in range(L.shape[0]):
+        X[i] = B[i]
+        for j in np.nonzero(L[i, :i] != 0)[0]:
+            X[i] = X[i] - L[i, j]*X[j]
+        X[i] = X[i] / L[i, i]
+    return X
+
+
+def triangular_factor(A, chunk: int = None) -> np.ndarray:
+    """
+    R factor of a QR decomposition of A (dense or scipy sparse), computed on chunks of rows so that
+    only about max((number of columns)^2, 2^22) entries are ever dense. A and R have the same singular values and kernel
+    """
+    n = A.shape[1]
+    if chunk is None:
+        chunk = max(n, 2**22 // max(n, 1))
+    R = np.zeros((0, n))
+    for start in range(0, A.shape[0], chunk):
+        block = np.asarray(densify(A[start: start+chunk]), dtype="float64")
+        R = np.linalg.qr(np.concatenate([R, block], axis=0), mode="r")
+    return R
+
+
+def matrix_rank(A, tol: float = None) -> int:
+    """numpy.linalg.matrix_rank of A, through its triangular factor if A is scipy sparse (tall constraint matrices)"""
+    if A.shape[0] == 0 or A.shape[1] == 0:
+        return 0
+    if not scipy.sparse.issparse(A):
+        return int(np.linalg.matrix_rank(A, tol=tol))
+    S = np.linalg.svd(triangular_factor(A), compute_uv=False)
+    if tol is None:
+        tol = S.max(initial=0) * max(A.shape) * np.finfo(float).eps
+    return int(np.count_nonzero(S > tol))
+
+
 def null_space(A: np.ndarray) -> np.ndarray:
+    if scipy.sparse.issparse(A):
+        if A.shape[0] == 0:
+            return np.eye(A.shape[1])
+        return scipy.linalg.null_space(triangular_factor(A), rcond=max(A.shape) * np.finfo(float).eps)
     # TODO: make sure this is equivalent to just scipy.linalg.null_space(A)
     # just scipy.linalg.null_space(A) works but seems to be way slower for A with nb of rows (a lot) bigger than number of columns
     P, L, U = scipy.linalg.lu(A)
@@ -188,15 +278,49 @@ def null_space(A: np.ndarray) -> np.ndarray:
     return basis
 
 
-def exact_null_space(A: np.ndarray) -> np.ndarray:
-    n, m = A.shape
-    A = np.concatenate([A, np.eye(m, dtype=decide_dtype(use_scipy=False))], axis=0)
-    A = A + Fraction()  # force fraction if possible
-    M = sympy.Matrix(A)
-    M = ((M.T).echelon_form()).T
-    M = np.array(M)
-    basis = M[:,np.where(np.all(M[:n]==0, axis=0))[0]][n:]
-    return basis
+class OrthonormalRowSpace:
+    """
+    Orthonormal basis of the span of floating point rows, added block by block.
+    Each block is first compressed to its own row space, then projected away from the current span,
+    and what remains (above the tolerance, chosen as in numpy.linalg.matrix_rank) extends the basis.
+    Only the basis is stored: rank times number of columns floats, whatever the number of rows added.
+    """
+
+    def __init__(self, n_columns: int):
+        self.n_columns = n_columns
+        self.Q = np.zeros((0, n_columns))
+        self.n_rows = 0
+        self.scale = 0.    # largest singular value of the blocks, a lower bound for the one of all the rows
+
+    @property
+    def rank(self) -> int:
+        return self.Q.shape[0]
+
+    def _tol(self) -> float:
+        return self.scale * max(self.n_rows, self.n_columns) * np.finfo(float).eps
+
+    def add_matrix(self, A, offset: int = 0):
+        """add the rows of A (dense or scipy sparse), whose columns are those of the row space starting from offset"""
+        A = np.asarray(densify(A), dtype="float64")
+        if A.size == 0:
+            return
+        self.n_rows += A.shape[0]
+        _, S, Vt = np.linalg.svd(A, full_matrices=False)
+        self.scale = max(self.scale, S[0])
+        V = np.zeros((np.count_nonzero(S > self._tol()), self.n_columns))
+        V[:, offset: offset + A.shape[1]] = S[:len(V), None] * Vt[:len(V)]
+        if len(V) == 0:
+            return
+        for _ in range(2):  # projecting twice keeps the basis orthogonal to working precision
+            V -= (V @ self.Q.T) @ self.Q
+        _, S, Vt = np.linalg.svd(V, full_matrices=False)
+        self.Q = np.concatenate([self.Q, Vt[S > self._tol()]], axis=0)
+
+    def null_space(self) -> np.ndarray:
+        """orthonormal basis of the orthogonal of the rows, as columns"""
+        if self.rank == 0:
+            return np.eye(self.n_columns)
+        return scipy.linalg.null_space(self.Q)
 
 
 def decide_dtype(use_scipy: bool = True):
@@ -0,0 +1,114 @@
+from __future__ import annotations
+from .groebner_polynomial import *
+import heapq
+import numpy as np
+
+
+class _LinearSpan:
+    """
+    Span of the normal form vectors of the new standard monomials, kept in echelon form.
+    Each row remembers how it is written in terms of the new standard monomials.
+    """
+
+    def __init__(self, dim: int, dtype, tol: float = 1e-10):
+        self.dim = dim
+        self.dtype = dtype
+        self.tol = tol
+        self.rows: List[np.ndarray] = []
+        self.pivots: List[int] = []
+        self.combinations: List[np.ndarray] = []
+        self.size = 0   # number of new standard monomials
+
+    def _zeros(self) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=self.dtype)
+        if self.dtype == object:
+            v[:] = Fraction(0)
+        return v
+
+    def _one(self):
+        # exact 1 for object arrays, so that dividing by pivots keeps Fractions
+        return Fraction(1) if self.dtype == object else 1.
+
+    def _is_zero(self, v: np.ndarray) -> bool:
+        if self.dtype == object:
+            return not v.any()
+        return np.max(np.abs(v), initial=0) <= self.tol
+
+    def insert(self, v: np.ndarray) -> Tuple[bool, np.ndarray]:
+        """
+        reduce v by the rows, if it becomes zero return (False, coefficients of v on the new standard monomials),
+        otherwise add it as a new standard monomial and return (True, None)
+        """
+        v = v.copy()
+        combination = self._zeros()
+        for p, row, comb in zip(self.pivots, self.rows, self.combinations):
+            c = v[p]
+            if c != 0:
+                v -= c*row
+                combination += c*comb
+        if self._is_zero(v):
+            return False, combination
+        if self.dtype == object:
+            p = int(np.nonzero(v)[0][0])
+        else:
+            p = int(np.argmax(np.abs(v)))
+        comb = -combination
+        comb[self.size] = self._one()
+        c = v[p]
+        self.rows.append(v/c)
+        self.combinations.append(comb/c)
+        self.pivots.append(p)
+        self.size += 1
+        return True, None
+
+
+def fglm(
+    staircase: List[Monomial], matrices: List[np.ndarray], symbols: List[Symbol], order: MonomialOrder
+) -> List[GroebnerPolynomial]:
+    """
+    FGLM conversion: reduced Groebner basis for the given order of a zero-dimensional ideal,
+    known through the standard monomials of its quotient (for any order) and the matrices of the
+    multiplication by each variable in that basis.
+    Monomials are visited in increasing order, their normal forms are obtained by applying a multiplication
+    matrix to the normal form of a smaller monomial, and the first linear dependencies give the new basis.
+    """
+    ctx = SymbolContext.get(symbols)
+    n = len(ctx.symbols)
+    dim = len(staircase)
+    dtype = matrices[0].dtype if len(matrices) > 0 else object
+    span = _LinearSpan(dim, dtype)
+    new_staircase: List[Monomial] = []
+    basis: List[GroebnerPolynomial] = []
+    leading: List[Monomial] = []
+
+    one = Monomial.one(ctx)
+    start = span._zeros()
+    start[staircase.index(one)] = span._one()
+    count = 0   # tie breaker, vectors cannot be compared
+    candidates = [(order.key(one), count, one, start)]
+    visited = {one}
+    while candidates:
+        _, _, m, v = heapq.heappop(candidates)
+        if any(m.is_multiple(lm) for lm in leading):
+            continue
+        independent, combination = span.insert(v)
+        if not independent:
+            terms = [MonomialWithCoef(1, m)]
+            for c, s in zip(combination, new_staircase):
+                if dtype != object:
+                    c = c.item() if abs(c) > span.tol else 0
+                if c != 0:
+                    terms.append(MonomialWithCoef(-c, s))
+            basis.append(GroebnerPolynomial(terms, symbols, order))
+            leading.append(m)
+            continue
+        new_staircase.append(m)
+        for i in range(n):
+            degrees = list(m.degrees)
+            degrees[i] += 1
+            child = Monomial._make(ctx, tuple(degrees), m.total_degree()+1)
+            if child not in visited:
+                visited.add(child)
+                count += 1
+                heapq.heappush(candidates, (order.key(child), count, child, matrices[i] @ v))
+    return basis
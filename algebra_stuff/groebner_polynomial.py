@@ -1,17 +1,55 @@
 from __future__ import annotations
 from .monomial import *
 import sympy
-import copy
+import heapq
+from typing import Iterator
 
 
 class GroebnerPolynomial:
+    """
+    Polynomial stored as parallel tuples of integer order keys, monomials and coefficients, sorted by decreasing monomial.
+    The tuples are never modified after creation, so polynomials can share them freely.
+    """
+    
     def __init__(self, monomials: List[MonomialWithCoef], symbols: List[Symbol], order: MonomialOrder):
         self.order = order
-        self.monomials = self._monom_sort(copy.deepcopy(monomials))
-        if Scalar.MODE == Scalar.FRACTION:
-            for mon in self.monomials:
-                mon.coef = Scalar.make(mon.coef)
         self.symbols = symbols
+        self._ctx = SymbolContext.get(symbols)
+        fraction_mode = Scalar.MODE == Scalar.FRACTION
+        collapsed: Dict[Monomial, Scalar] = {}
+        for mon in monomials:
+            coef = Scalar.make(mon.coef) if fraction_mode else mon.coef
+            if mon.monomial in collapsed:
+                collapsed[mon.monomial] += coef
+            else:
+                collapsed[mon.monomial] = coef
+        terms = [(order.key(m), m, c) for m, c in collapsed.items() if c != 0]
+        terms.sort(key=lambda t: t[0], reverse=True)
+        self._keys = tuple(t[0] for t in terms)
+        self._monoms = tuple(t[1] for t in terms)
+        self._coefs = tuple(t[2] for t in terms)
+    
+    @classmethod
+    def _from_terms(cls, keys: tuple, monoms: Tuple[Monomial, ...], coefs: tuple, symbols: List[Symbol], order: MonomialOrder, ctx: SymbolContext = None) -> GroebnerPolynomial:
+        # fast constructor for internal use: the terms must already be sorted, collapsed and without zero coefficients
+        poly = object.__new__(cls)
+        poly.order = order
+        poly.symbols = symbols
+        poly._ctx = ctx if ctx is not None else SymbolContext.get(symbols)
+        poly._keys = keys
+        poly._monoms = monoms
+        poly._coefs = coefs
+        return poly
+    
+    def _with_terms(self, keys: tuple, monoms: Tuple[Monomial, ...], coefs: tuple) -> GroebnerPolynomial:
+        return GroebnerPolynomial._from_terms(keys, monoms, coefs, self.symbols, self.order, self._ctx)
+    
+    @property
+    def monomials(self) -> List[MonomialWithCoef]:
+        return [MonomialWithCoef(c, m) for m, c in zip(self._monoms, self._coefs)]
+    
+    def terms(self) -> Iterator[Tuple[Scalar, Monomial]]:
+        return zip(self._coefs, self._monoms)
     
     @classmethod
     def make(cls, poly: Union[GroebnerPolynomial, sympy.Expr, Scalar], order: MonomialOrder = degrevlex, symbols: List[Symbol] = None) -> GroebnerPolynomial:
@@ -19,7 +57,7 @@ class GroebnerPolynomial:
         if isinstance(poly, cls):
             return poly
         elif isinstance(poly, MonomialWithCoef):
-            return cls([poly], symbols if symbols is not None else poly.symbols, order=order)
+            return cls([poly], symbols if symbols is not None else poly.monomial.symbols, order=order)
         elif isinstance(poly, Monomial):
             return cls([MonomialWithCoef(1, poly)], symbols if symbols is not None else poly.symbols, order=order)
         elif isinstance(poly, sympy.Expr):
@@ -86,106 +124,186 @@ class GroebnerPolynomial:
     
     def _leading(self) -> MonomialWithCoef:
         if self.is_zero():
-            return MonomialWithCoef(Scalar.make(0), Monomial(self.symbols, []))
-        return self.monomials[0]
+            return MonomialWithCoef(Scalar.make(0), Monomial.one(self._ctx))
+        return MonomialWithCoef(self._coefs[0], self._monoms[0])
     
     def get_coef(self, i: int) -> Scalar:
-        return self.monomials[i].coef
+        return self._coefs[i]
     
     def get_monomial(self, i: int) -> Monomial:
-        return self.monomials[i].monomial
+        return self._monoms[i]
     
     @property
     def lc(self) -> Scalar:
-        return self._leading().coef
+        if self.is_zero():
+            return Scalar.make(0)
+        return self._coefs[0]
     
     @property
     def lm(self) -> Monomial:
-        return self._leading().monomial
+        if self.is_zero():
+            return Monomial.one(self._ctx)
+        return self._monoms[0]
     
     def degree(self) -> int:
         return self.lm.total_degree()
     
-    def _monom_sort(self, monomials: List[MonomialWithCoef]) -> List[MonomialWithCoef]:
-        # works both in place and not in place
-        monomials.sort(key=lambda m: self.order.eval(m.monomial), reverse=True)
-        return monomials
-
-    def _monom_collapse(self, monomials: List[MonomialWithCoef]) -> List[MonomialWithCoef]:
-        # does not work in place
-        monomials = copy.deepcopy(monomials)
-        monomials = [mon for mon in monomials if mon.coef != 0]
-        i = 0
-        while i < len(monomials):
-            j = i+1
-            while j < len(monomials) and self.order.eq(monomials[i].monomial, monomials[j].monomial):
+    def _merge(self, keys: tuple, monoms: Tuple[Monomial, ...], coefs: tuple) -> GroebnerPolynomial:
+        """sum of self and the polynomial given by its sorted terms, in one linear pass"""
+        keys1, monoms1, coefs1 = self._keys, self._monoms, self._coefs
+        len1, len2 = len(keys1), len(keys)
+        if len2 == 0:
+            return self
+        if len1 == 0:
+            return self._with_terms(keys, monoms, coefs)
+        res_keys, res_monoms, res_coefs = [], [], []
+        i = j = 0
+        while i < len1 and j < len2:
+            k1, k2 = keys1[i], keys[j]
+            if k1 > k2:
+                res_keys.append(k1)
+                res_monoms.append(monoms1[i])
+                res_coefs.append(coefs1[i])
+                i += 1
+            elif k1 < k2:
+                res_keys.append(k2)
+                res_monoms.append(monoms[j])
+                res_coefs.append(coefs[j])
                 j += 1
-            if j > i+1:
-                monomials[i].coef = sum(monomials[k].coef for k in range(i, j))
-                if monomials[i].coef == 0:
-                    i -= 1
-                monomials = monomials[:i+1] + monomials[j:]
-            i += 1
-        return monomials
-    
-    def _monom_arrange(self, monomials: List[MonomialWithCoef]) -> List[MonomialWithCoef]:
-        self._monom_sort(monomials)
-        return self._monom_collapse(monomials)
+            else:
+                c = coefs1[i] + coefs[j]
+                if c != 0:
+                    res_keys.append(k1)
+                    res_monoms.append(monoms1[i])
+                    res_coefs.append(c)
+                i += 1
+                j += 1
+        if i < len1:
+            res_keys.extend(keys1[i:])
+            res_monoms.extend(monoms1[i:])
+            res_coefs.extend(coefs1[i:])
+        elif j < len2:
+            res_keys.extend(keys[j:])
+            res_monoms.extend(monoms[j:])
+            res_coefs.extend(coefs[j:])
+        return self._with_terms(tuple(res_keys), tuple(res_monoms), tuple(res_coefs))
+    
+    def _term_multiple(self, coef: Scalar, monomial: Monomial) -> Tuple[tuple, tuple, tuple]:
+        """sorted terms of coef*monomial*self; multiplying by a monomial does not change the order of the terms"""
+        if monomial.is_constant():
+            monoms = self._monoms
+            keys = self._keys
+        else:
+            order = self.order
+            shift = order.key(monomial)
+            keys = tuple(k + shift for k in self._keys)
+            monoms = tuple(m*monomial for m in self._monoms)
+            for m, k in zip(monoms, keys):
+                m._key, m._key_order = k, order
+        coefs = tuple(c*coef for c in self._coefs)
+        if any(c == 0 for c in coefs):
+            kept = [i for i, c in enumerate(coefs) if c != 0]
+            return tuple(keys[i] for i in kept), tuple(monoms[i] for i in kept), tuple(coefs[i] for i in kept)
+        return keys, monoms, coefs
+    
+    def sub_term_multiple(self, coef: Scalar, monomial: Monomial, other: GroebnerPolynomial) -> GroebnerPolynomial:
+        """compute self - coef*monomial*other without building intermediate polynomials"""
+        return self._merge(*other._term_multiple(-coef, monomial))
+    
+    def _heap_mul(self, other: GroebnerPolynomial) -> GroebnerPolynomial:
+        """
+        product of two polynomials by merging the rows self[i]*other with a heap (Johnson's algorithm),
+        so that the terms come out already sorted and the heap never holds more than len(self) entries
+        """
+        keys1, monoms1, coefs1 = self._keys, self._monoms, self._coefs
+        keys2, monoms2, coefs2 = other._keys, other._monoms, other._coefs
+        len1, len2 = len(keys1), len(keys2)
+        
+        heap = [(-keys1[0]-keys2[0], 0, 0)]     # keys are negated since heapq pops the smallest entry
+        res_keys, res_monoms, res_coefs = [], [], []
+        while heap:
+            neg_key, i, j = heapq.heappop(heap)
+            c = coefs1[i]*coefs2[j]
+            if res_keys and res_keys[-1] == -neg_key:
+                res_coefs[-1] += c
+            else:
+                if res_coefs and res_coefs[-1] == 0:
+                    res_keys.pop()
+                    res_monoms.pop()
+                    res_coefs.pop()
+                m = monoms1[i]*monoms2[j]
+                m._key, m._key_order = -neg_key, self.order
+                res_keys.append(-neg_key)
+                res_monoms.append(m)
+                res_coefs.append(c)
+            if j+1 < len2:
+                heapq.heappush(heap, (-keys1[i]-keys2[j+1], i, j+1))
+            if j == 0 and i+1 < len1:
+                heapq.heappush(heap, (-keys1[i+1]-keys2[0], i+1, 0))
+        if res_coefs and res_coefs[-1] == 0:
+            res_keys.pop()
+            res_monoms.pop()
+            res_coefs.pop()
+        return self._with_terms(tuple(res_keys), tuple(res_monoms), tuple(res_coefs))
     
     def _make_and_check(self, other) -> GroebnerPolynomial:
         other = GroebnerPolynomial.make(other, order=self.order, symbols=self.symbols)
-        if not self.symbols == other.symbols:
+        if not self._ctx is other._ctx:
             raise ValueError("symbols between polynomials do not match")
         return other
     
     def __eq__(self, other: GroebnerPolynomial) -> bool:
         if not isinstance(other, GroebnerPolynomial):
             other = GroebnerPolynomial.make(other, self.order, self.symbols)
-        return self.monomials == other.monomials
+        return self._monoms == other._monoms and self._coefs == other._coefs
     
     def __add__(self, other) -> GroebnerPolynomial:
         other = self._make_and_check(other)
-        monomials = self.monomials + other.monomials
-        monomials = self._monom_arrange(monomials)
-        return GroebnerPolynomial(monomials, self.symbols, self.order)
+        return self._merge(other._keys, other._monoms, other._coefs)
     
     def __radd__(self, other):
         return self + other
     
     def __neg__(self):
-        monomials = [MonomialWithCoef(-m.coef, m.monomial) for m in self.monomials]
-        return GroebnerPolynomial(monomials, self.symbols, self.order)
+        return self._with_terms(self._keys, self._monoms, tuple(-c for c in self._coefs))
     
     def __sub__(self, other):
         return self.__add__(-other)
     
     def __mul__(self, other):
+        if isinstance(other, Monomial):
+            return self._with_terms(*self._term_multiple(1, other))
+        if isinstance(other, MonomialWithCoef):
+            coef = Scalar.make(other.coef) if Scalar.MODE == Scalar.FRACTION else other.coef
+            return self._with_terms(*self._term_multiple(coef, other.monomial))
         try:
             other = self._make_and_check(other)
         except:
             print("MUL:", other, type(other))
             raise
-        monomials = [m1*m2 for m1 in self.monomials for m2 in other.monomials]
-        monomials = self._monom_arrange(monomials)
-        return GroebnerPolynomial(monomials, self.symbols, self.order)
+        if len(self) == 0 or len(other) == 0:
+            return self._with_terms((), (), ())
+        if len(other) == 1:
+            return self._with_terms(*self._term_multiple(other._coefs[0], other._monoms[0]))
+        return self._heap_mul(other)
     
     def __rmul__(self, other):
         return self * other
     
     def __truediv__(self, other: Scalar):
         if isinstance(other, Scalar.TYPES):
-            return GroebnerPolynomial([m / other for m in self.monomials], self.symbols, self.order)
+            return self._with_terms(self._keys, self._monoms, tuple(c / other for c in self._coefs))
         raise TypeError
     
     def __len__(self):
-        return len(self.monomials)
+        return len(self._coefs)
     
     def is_zero(self, tol: float = 1e-12) -> bool:
-        if len(self.monomials) > 0 and all(abs(m.coef) <= tol for m in self.monomials):
-            if len(self.monomials) > 1:
+        if len(self._coefs) > 0 and all(abs(c) <= tol for c in self._coefs):
+            if len(self._coefs) > 1:
                 print("Warning: probably unprecise computation")
             return True
-        return len(self.monomials) == 0
+        return len(self._coefs) == 0
     
     def to_monic(self):
         c = self.lc
@@ -210,9 +328,7 @@ class GroebnerPolynomial:
         #return sep_plus.join(map(repr, self.monomials))
     
     def __hash__(self):
-        monom_hash = tuple(hash(m.monomial) for m in self.monomials)
-        coef_hash = tuple(hash(m.coef) for m in self.monomials)
-        return hash((monom_hash, coef_hash))
+        return hash((self._monoms, self._coefs))
     
     def macaulay2_repr(self):
         return "+".join(monom.macaulay2_repr() for monom in self.monomials)
@@ -1,4 +1,6 @@
 from .hom import *
+from typing import Optional, Union
+import time
 
 
 class HilbertScheme:
@@ -11,33 +13,158 @@ class HilbertScheme:
             R = infer_poly_ring()
         self.R = R
     
-    def tangent_space(self, I: PolyRingIdeal, use_scipy: bool = True):
+    def tangent_space(self, I: PolyRingIdeal, use_scipy: bool = True, char: int = 0, precompute_constraints: bool = True, method: str = "hom"):
         # TODO: sanity check that I is an ideal of R
-        return HilbertSchemeTangentSpace(self, I, use_scipy=use_scipy)
+        return HilbertSchemeTangentSpace(self, I, use_scipy=use_scipy, char=char, precompute_constraints=precompute_constraints, method=method)
+    
+    def tangent_dim(self, I: PolyRingIdeal, use_scipy: bool = True, char: int = 0, method: str = "hom") -> int:
+        """
+        dimension of the tangent space at I. At a monomial ideal it only depends on the orbit of I under permutations
+        of the variables: it is cached in IDEAL_CACHE under the canonical form of I (see PolyRingIdeal.canonical_form)
+        """
+        dim, _ = self.timed_tangent_dim(I, use_scipy=use_scipy, char=char, method=method)
+        return dim
+    
+    def timed_tangent_dim(self, I: PolyRingIdeal, use_scipy: bool = True, char: int = 0, method: str = "hom") -> Tuple[int, float]:
+        """
+        tangent_dim and the time in seconds spent computing it. A cached dimension comes with the time of the computation
+        stored with it, not the time of the lookup
+        """
+        def compute() -> Tuple[int, float]:
+            t0 = time.time()
+            dim = self.tangent_space(I, use_scipy=use_scipy, char=char, method=method).dim()
+            return dim, time.time() - t0
+        
+        if not I.is_monomial:
+            return compute()
+        canonical, _ = I.canonical_form()
+        key = IdealCache.make_key("hilbert_tangent_dim", self.R.n, canonical)
+        field = f"dim_time_char_{char}"
+        timed_dim = IDEAL_CACHE.get(key, field)
+        if timed_dim is None:
+            timed_dim = compute()
+            IDEAL_CACHE.set(key, field, timed_dim)
+        return timed_dim
+
+
+def arm_leg_character(I: PolyRingIdeal) -> Dict[Tuple[int, int], int]:
+    """
+    character of the tangent space of Hilb(A²) at the monomial ideal I, with the weights of HomSpace.weights:
+    every box s of the staircase of I, of arm a(s) (boxes after it along the first variable) and leg l(s)
+    (along the second variable), contributes the weights (-a(s)-1, l(s)) and (a(s), -l(s)-1)
+    """
+    boxes = {m.degrees for m in I.staircase()}
+    character: Dict[Tuple[int, int], int] = {}
+    for i, j in boxes:
+        arm, leg = 0, 0
+        while (i+arm+1, j) in boxes:
+            arm += 1
+        while (i, j+leg+1) in boxes:
+            leg += 1
+        for weight in [(-arm-1, leg), (arm, -leg-1)]:
+            character[weight] = character.get(weight, 0) + 1
+    return character
 
 
 class HilbertSchemeTangentSpace:
-    def __init__(self, base: HilbertScheme, I: PolyRingIdeal, use_scipy: bool = True):
+    METHODS = ("hom", "presentation")
+    
+    def __init__(self, base: HilbertScheme, I: PolyRingIdeal, use_scipy: bool = True, char: int = 0, precompute_constraints: bool = True, method: str = "hom"):
         """
         I ideal of a polynomial ring R, giving a zero dimensional subscheme Z of length n.
         Represents the tangent of the Hilbert scheme of points n at the point [Z]
+        char: 0, or a prime to compute the dimension and basis exactly modulo this prime (see HomSpace)
+        method: "hom" to compute Hom(I/I², R/I) on a vector space basis of I/I² (which needs I**2),
+        or "presentation" to compute Hom(I, R/I), the same space, from the syzygies of the Groebner basis of I (see PresentationHomSpace).
+        The basis is then given by the images of the elements of the Groebner basis
         """
+        if method not in self.METHODS:
+            raise ValueError(f"unknown tangent space method '{method}', expected one of {self.METHODS}")
         self.base = base
         self.R = base.R
         self.I = I
         self.S = self.R//I  # all modules will be over this ring
-        self.J = I/I**2
+        self.method = method
         self.O = self.R/I
         self.use_scipy = use_scipy
-        self.hom_space = HomSpace(self.J, self.O, base=self.S, use_scipy=use_scipy)
+        self.char = char
+        # at monomial ideals the dimension is computed from the torus weight blocks, the full constraints are only built on demand
+        self.precompute_constraints = precompute_constraints and not self.is_torus_fixed()
+        # I/I² and the Hom space are built on first use: not at all for the dimension when there is a closed form
+        self._J = None
+        self._hom_space = None
+    
+    @property
+    def J(self) -> IdealQuotientModule:
+        """I/I² ("hom" method only, None otherwise)"""
+        if self._J is None and self.method == "hom":
+            self._J = IdealQuotientModule(self.S, top_ideal=self.I, bot_ideal=self.I**2)  # over S, whatever ring is focused now
+        return self._J
+    
+    @property
+    def hom_space(self) -> Union[HomSpace, PresentationHomSpace]:
+        if self._hom_space is None:
+            if self.method == "presentation":
+                self._hom_space = PresentationHomSpace(
+                    self.I, self.O, precompute_constraints=self.precompute_constraints, use_scipy=self.use_scipy, char=self.char
+                )
+            else:
+                self._hom_space = HomSpace(
+                    self.J, self.O, base=self.S, precompute_constraints=self.precompute_constraints, use_scipy=self.use_scipy, char=self.char
+                )
+        return self._hom_space
     
     def _constraints(self) -> np.ndarray:
         return self.hom_space._get_constraints()
     
-    def dim(self) -> int:
-        return self.hom_space.dim()
+    def is_torus_fixed(self) -> bool:
+        return self.I.is_monomial
+    
+    def closed_form_dim(self) -> Optional[int]:
+        """
+        dimension of the tangent space when known without computation, None otherwise:
+        the Hilbert schemes of n points of A¹ and A² are smooth, of dimension n and 2n
+        """
+        n = self.I.colength()
+        if self.R.n == 1:
+            return n
+        if self.R.n == 2:
+            return 2*n
+        return None
+    
+    def character(self, workers: int = None, check: bool = False) -> Dict[Tuple[int, ...], int]:
+        """
+        for a monomial ideal, dimension of the tangent space in each torus weight: given by arm_leg_character in two variables,
+        otherwise computed one weight block of the constraints at a time (in a pool of workers threads if workers is given).
+        check: also compute the blocks in two variables, and raise a ValueError if the results differ
+        """
+        if not self.is_torus_fixed():
+            raise ValueError("the character is only defined at monomial ideals")
+        if self.R.n != 2:
+            return self.hom_space.character(workers=workers)
+        character = arm_leg_character(self.I)
+        if check and character != self.hom_space.character(workers=workers):
+            raise ValueError(f"the arm and leg character differs from the computed one at {self.I}")
+        return character
+    
+    def _computed_dim(self) -> int:
+        if self.is_torus_fixed() and self.hom_space.weights() is not None:
+            return int(sum(self.hom_space.character().values()))
+        return int(self.hom_space.dim())
         #return hom_rank(self.J, self.O, char=self.char)
     
+    def dim(self, check: bool = False) -> int:
+        """
+        the closed form dimension when there is one (see closed_form_dim), the rank of the constraints otherwise.
+        check: also compute the rank, and raise a ValueError if the results differ
+        """
+        d = self.closed_form_dim()
+        if d is None:
+            return self._computed_dim()
+        if check and d != self._computed_dim():
+            raise ValueError(f"the closed form dimension {d} differs from the computed one at {self.I}")
+        return d
+    
     def basis(self) -> np.ndarray:
         return self.hom_space.basis()
         #return hom(self.J, self.O, char=self.char)
@@ -1,16 +1,29 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from .module import *
+from .modular import *
+import concurrent.futures
 import scipy
 import scipy.linalg
+import scipy.sparse
 
 
 class HomSpace:
-    def __init__(self, M: Module, N: Module, base: FiniteDimRing = None, precompute_constraints: bool = True, use_scipy: bool = True):
+    def __init__(self, M: Module, N: Module, base: FiniteDimRing = None, precompute_constraints: bool = True, use_scipy: bool = True, generators_only: bool = False, char: int = 0):
+        """
+        generators_only: only impose commutation with the variables, which generate the base ring as an algebra,
+        instead of every element of its basis (same space, much smaller constraint matrix)
+        char: 0 for the usual computations, or a prime p (e.g. MODULAR_PRIME) to compute exactly modulo p,
+        the constraints are then int64 residues and the basis is given modulo p
+        (the dimension is the one over the rationals for all but finitely many primes)
+        """
         # TODO: make some sanity checks (or try to convert modules to be over the given base)
+        check_characteristic(char)
         self.M = M
         self.N = N
         self.use_scipy = use_scipy #or Scalar.MODE != Scalar.FRACTION
+        self.generators_only = generators_only
+        self.char = char
         self.dtype = decide_dtype(self.use_scipy)
         if base is None:
             base = M.base_ring
@@ -32,6 +45,29 @@ class HomSpace:
     def codomain(self) -> Module:
         return self.N
     
+    def _action_matrices(self, generators_only: bool = None) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """matrices of the action of the base ring (or of its generators) on M and N, reduced modulo char if char > 0"""
+        dtype = object if self.char > 0 else self.dtype    # exact matrices to be reduced modulo char
+        if generators_only is None:
+            generators_only = self.generators_only
+        if generators_only:
+            FM = self.M.get_generator_matrices(dtype=dtype)
+            ExecTimes.time_step("get matrices of N")
+            FN = self.N.get_generator_matrices(dtype=dtype)
+        else:
+            FM = self.M.get_matrices_representation(dtype=dtype)
+            ExecTimes.time_step("get matrices of N")
+            FN = self.N.get_matrices_representation(dtype=dtype)
+        if self.char > 0:
+            FM = [to_modular(A, self.char) for A in FM]
+            FN = [to_modular(B, self.char) for B in FN]
+        return FM, FN
+    
+    def _kron_constraints(self, FM: List[np.ndarray], FN: List[np.ndarray]):
+        if self.char > 0:
+            return kron_constraints(FM, FN, dtype="int64", char=self.char)
+        return kron_constraints(FM, FN, dtype=self.dtype)
+    
     @ExecTimes.track_time
     def _compute_constraints(self) -> np.ndarray:
         # give a matrix C such that for H a matrix k^m -> k^n,
@@ -43,41 +79,45 @@ class HomSpace:
         ExecTimes.time_step("get matrices of M")
         m = self.M.dim
         n = self.N.dim
-        k = self.ring.dim
-        FM = self.M.get_matrices_representation(dtype=self.dtype)
-        ExecTimes.time_step("get matrices of N")
-        FN = self.N.get_matrices_representation(dtype=self.dtype)
-        ExecTimes.time_step(f"init zero matrix of dim {n*m*k} x {n*m}")
-        C = np.zeros((n*m*k, n*m), dtype=self.dtype)
-        CCC = np.copy(C)
-        ExecTimes.time_step("fill the matrix with constraints")
-        for f_ind in range(k):
-            for i in range(n):
-                # TODO: try to get rid of one more for loop via numpy
-                for j in range(m):
-                    ind = f_ind*n*m + i*m + j
-                    C[ind, i*m: i*m+m] += FM[f_ind][:, j]
-                    C[ind, j: n*m+j: m] -= FN[f_ind][i]
-        #C = C[np.any(C, axis=1)]    # filter out some useless constraints
-        C = filter_zero(C)
+        FM, FN = self._action_matrices()
+        k = len(FM)
+        ExecTimes.time_step(f"assemble the constraints of dim {n*m*k} x {n*m}")
+        C = self._kron_constraints(FM, FN)
         self.constraints_computed = True
         return C
     
+    def constraint_blocks(self) -> Iterator[np.ndarray]:
+        """
+        the constraints of _compute_constraints, one block of rows per element of the base ring
+        (or per generator), without ever assembling the whole matrix
+        """
+        if not self.M.base_ring == self.N.base_ring:
+            raise TypeError("modules are not defined over the same ring")
+        FM, FN = self._action_matrices()
+        for A, B in zip(FM, FN):
+            yield self._kron_constraints([A], [B])
+    
     def _get_constraints(self) -> np.ndarray:
         if self.constraints_computed:
             return self.constraints
         self.constraints = self._compute_constraints()
         return self.constraints
     
+    def _shape(self) -> Tuple[int, int]:
+        # shape (n, m) of the matrices H whose vectorizations H_ are the unknowns of the constraints
+        return self.N.dim, self.M.dim
+    
     def dim(self) -> int:
-        m = self.M.dim
-        n = self.N.dim
+        n, m = self._shape()
+        if self.char > 0:
+            return int(m*n - modular_rank(self._get_constraints(), self.char))
         C = self._get_constraints()
-        C = C if self.use_scipy else C.astype("float64")
-        rank = (np.linalg.matrix_rank(C) if C.size > 0 else 0)
-        return m*n - rank
+        C = C if self.use_scipy else np.asarray(C, dtype="float64")
+        return int(m*n - matrix_rank(C))
     
     def basis(self) -> np.ndarray:
+        if self.char > 0:
+            return modular_null_space(self._get_constraints(), self.char)
         C = self._get_constraints()
         if self.use_scipy:
             basis = null_space(C)
@@ -87,10 +127,32 @@ class HomSpace:
                 basis = basis.astype("float64")
         return basis
     
+    def weights(self) -> List[Tuple[int, ...]]:
+        """
+        torus weights of the unknowns H_ij (in the order of H_, index i*m+j): weight of the i-th basis element of N
+        minus the one of the j-th basis element of M. None if the modules are not graded by the torus
+        """
+        weights_M = self.M.weights()
+        weights_N = self.N.weights()
+        if weights_M is None or weights_N is None:
+            return None
+        return [tuple(a - b for a, b in zip(w_N, w_M)) for w_N in weights_N for w_M in weights_M]
+    
+    def character(self, workers: int = None) -> Dict[Tuple[int, ...], int]:
+        """dimension of each weight space of Hom(M, N) (see weight_character), the modules must be graded by the torus"""
+        weights = self.weights()
+        if weights is None:
+            raise ValueError("the modules are not graded by the torus action")
+        if self.generators_only and self.constraints_computed:
+            C = self.constraints
+        else:
+            # commuting with the generators is enough, and much smaller
+            C = self._kron_constraints(*self._action_matrices(generators_only=True))
+        return weight_character(C, weights, char=self.char, workers=workers)
+    
     def basis_as_matrices(self) -> List[np.ndarray]:
         basis = self.basis()
-        m = self.M.dim
-        n = self.N.dim
+        n, m = self._shape()
         basis_list = []
         for vect in basis.T:
             vect = vect.reshape((n, m))
@@ -115,6 +177,132 @@ class HomSpace:
         return matrix
 
 
+class PresentationHomSpace(HomSpace):
+    def __init__(self, I: PolyRingIdeal, N: RingQuotientModule, precompute_constraints: bool = True, use_scipy: bool = True, char: int = 0, groebner: bool = True):
+        """
+        Hom_R(I, N) for an ideal I of R and N = R/J, computed from a presentation of I: a morphism is given by the images
+        in N of generators g_k of I, which must satisfy every syzygy of the g_k.
+        The unknowns are the s*n coordinates of these images (s generators, n = dim N), instead of dim(M)*n for
+        a module M presenting the domain (e.g. I/I**2 in HilbertSchemeTangentSpace, which needs I**2).
+        Same interface as HomSpace, H being the n x s matrix whose column k holds the coordinates of the image of g_k
+        groebner: the g_k are the elements of the Groebner basis of I (see PolyRingIdeal.groebner_syzygies),
+        otherwise the generators I.gens (see PolyRingIdeal.syzygies)
+        """
+        check_characteristic(char)
+        if not isinstance(N, RingQuotientModule):
+            raise TypeError("the codomain must be a quotient R/J of the polynomial ring")
+        self.I = I
+        self.M = I  # the domain, an ideal of R: not a finite dimensional module, no action matrices
+        self.N = N
+        self.groebner = groebner
+        self.generators = I.groebner_basis if groebner else I.gens
+        self.use_scipy = use_scipy
+        self.generators_only = False
+        self.char = char
+        self.dtype = decide_dtype(self.use_scipy)
+        self.ring = N.base_ring
+    
+        self.constraints_computed = False
+        if precompute_constraints:
+            self.constraints = self._compute_constraints()
+        else:
+            self.constraints = np.zeros((1, 1), dtype=self.dtype)
+    
+    def domain(self) -> PolyRingIdeal:
+        return self.I
+    
+    def _action_matrices(self, generators_only: bool = None):
+        raise TypeError("the domain is an ideal of the polynomial ring, the constraints come from the syzygies of its generators")
+    
+    def _shape(self) -> Tuple[int, int]:
+        return self.N.dim, len(self.generators)
+    
+    def _multiplication_tensor(self, polys: List[GroebnerPolynomial]) -> Tuple[np.ndarray, Dict[Monomial, int]]:
+        # matrices of the multiplication on N by the monomials appearing in polys, and the index of each monomial
+        monomials = list(dict.fromkeys(m for f in polys for _, m in f.terms()))
+        T = self.N.structure_ideal.action_tensor(monomials, self.N.basis)
+        return T, {m: a for a, m in enumerate(monomials)}
+    
+    @ExecTimes.track_time
+    def _compute_constraints(self) -> np.ndarray:
+        # for each syzygy a, the n coordinates of sum(a[k]*H[:, k]) vanish, a[k] acting on N by its multiplication matrix
+        ExecTimes.time_step("syzygies of the generators")
+        syzygies = self.I.groebner_syzygies() if self.groebner else self.I.syzygies()
+        n, s = self._shape()
+        ExecTimes.time_step("multiplication matrices")
+        T, index = self._multiplication_tensor([a for syzygy in syzygies for a in syzygy])
+        ExecTimes.time_step(f"assemble the constraints of dim {n*len(syzygies)} x {n*s}")
+        rows, cols, values = [], [], []
+        for r, syzygy in enumerate(syzygies):
+            for k, a in enumerate(syzygy):
+                for c, m in a.terms():
+                    A = T[index[m]]
+                    i, b = np.nonzero(A != 0)
+                    rows.append(r*n + i)
+                    cols.append(b*s + k)
+                    values.append(c*A[i, b])
+        shape = (n*len(syzygies), n*s)
+        rows = np.concatenate(rows + [np.zeros(0, dtype=int)])
+        cols = np.concatenate(cols + [np.zeros(0, dtype=int)])
+        values = np.concatenate(values + [np.zeros(0, dtype=T.dtype)])
+        self.constraints_computed = True
+        if self.char > 0:
+            C = scipy.sparse.csr_matrix((to_modular(values, self.char), (rows, cols)), shape=shape)
+            C.data %= self.char
+        elif np.dtype(self.dtype) == object:
+            # exact computations, dense as in kron_constraints
+            C = np.zeros(shape, dtype=object)
+            C[...] = Fraction(0) if Scalar.MODE == Scalar.FRACTION else 0.
+            np.add.at(C, (rows, cols), values)
+            return filter_zero(C)
+        else:
+            C = scipy.sparse.csr_matrix((values.astype(self.dtype), (rows, cols)), shape=shape)
+        C.eliminate_zeros()
+        return C[C.getnnz(axis=1) > 0]
+    
+    def constraint_blocks(self) -> Iterator[np.ndarray]:
+        yield self._get_constraints()
+    
+    def weights(self) -> List[Tuple[int, ...]]:
+        """
+        torus weights of the unknowns H_ik (index i*s+k): weight of the i-th basis element of N minus the degree of g_k.
+        None if I is not monomial or N not graded by the torus
+        """
+        weights_N = self.N.weights()
+        if not self.I.is_monomial or weights_N is None:
+            return None
+        degrees = [g.lm.degrees for g in self.generators]
+        return [tuple(a - b for a, b in zip(w_N, d)) for w_N in weights_N for d in degrees]
+    
+    def character(self, workers: int = None) -> Dict[Tuple[int, ...], int]:
+        weights = self.weights()
+        if weights is None:
+            raise ValueError("the ideal is not monomial or the codomain is not graded by the torus action")
+        return weight_character(self._get_constraints(), weights, char=self.char, workers=workers)
+    
+    def basis_as_morphisms(self) -> List[MorphismFromPresentation]:
+        return [MorphismFromPresentation(self, matrix) for matrix in self.basis_as_matrices()]
+    
+    def apply_morphism(self, phi: np.ndarray, f: GroebnerPolynomial):
+        """apply a morphism phi given by the images of the generators (n x s matrix) to the element f of I"""
+        f = GroebnerPolynomial.make(f, order=self.I.order, symbols=self.I.symbols)
+        quotients, remainder = PolyRingIdeal.divide(f, self.I.groebner_basis)
+        if not remainder.is_zero():
+            raise ValueError(f"{f} is not in the domain")
+        if not self.groebner:
+            A = self.I.groebner_cofactors()
+            quotients = [sum((q*A[i][k] for i, q in enumerate(quotients)), f*0) for k in range(len(self.generators))]
+        T, index = self._multiplication_tensor(quotients)
+        res = sum(c*T[index[m]] @ phi[:, k] for k, q in enumerate(quotients) for c, m in q.terms())
+        return self.N.from_basis(res if len(index) > 0 else np.zeros(self.N.dim))
+    
+    def get_matrix_representation(self, phi: Morphism):
+        """for a module morphism phi: I -> N, the matrix of the images of the generators"""
+        matrix = [self.N.to_basis(phi(g)) for g in self.generators]
+        matrix = np.array(matrix, dtype=self.dtype).T
+        return matrix
+
+
 class MorphismFromMatrix:
     def __init__(self, M: Module, N: Module, matrix: np.ndarray):
         self.M = M
@@ -136,6 +324,22 @@ class MorphismFromMatrix:
         return self.N.from_basis(res)
 
 
+class MorphismFromPresentation:
+    """morphism I -> N given by the images of the generators of I (see PresentationHomSpace)"""
+    def __init__(self, hom_space: PresentationHomSpace, matrix: np.ndarray):
+        self.hom_space = hom_space
+        self.matrix = matrix
+    
+    def domain(self) -> PolyRingIdeal:
+        return self.hom_space.I
+    
+    def codomain(self) -> Module:
+        return self.hom_space.N
+    
+    def __call__(self, f: GroebnerPolynomial):
+        return self.hom_space.apply_morphism(self.matrix, f)
+
+
 def hom_complexity(M: ModuleFromIdeal, N: ModuleFromIdeal):
     ring = M.base_ring
     m = len(M.basis)
@@ -148,36 +352,125 @@ def hom_complexity(M: ModuleFromIdeal, N: ModuleFromIdeal):
     
 
 @ExecTimes.track_time
-def hom_constraints(M: ModuleFromIdeal, N: ModuleFromIdeal) -> np.ndarray:
+def hom_constraints(M: ModuleFromIdeal, N: ModuleFromIdeal, generators_only: bool = False) -> np.ndarray:
     # give a matrix C such that for H a matrix k^m -> k^n,
     # H represents a morphism of modules M -> N iff CH_ = 0,
     # where H_ is a vectorized form of H (Hij = H_(i*m+j))
+    # with generators_only, only the commutation with the variables is imposed (which is enough)
     if not M.base_ring == N.base_ring:
         raise TypeError("modules are not defined over the same ring")
     
     ExecTimes.time_step("get matrices of M")
-    ring = M.base_ring
     m = len(M.basis)
     n = len(N.basis)
-    k = len(ring.basis)
-    FM = M.get_matrices_representation()
-    ExecTimes.time_step("get matrices of N")
-    FN = N.get_matrices_representation()
-    ExecTimes.time_step(f"init zero matrix of dim {n*m*k} x {n*m}")
-    A = np.zeros((n*m*k, n*m))
-    ExecTimes.time_step("fill the matrix with constraints")
-    for f_ind in range(k):
-        for i in range(n):
-            for j in range(m):
-                ind = f_ind*n*m + i*m + j
-                A[ind, i*m: i*m+m] += FM[f_ind][:, j]
-                A[ind, j: n*m+j: m] -= FN[f_ind][i]
-                # for l in range(m):
-                #     A[ind, i*m+l] += FM[f_ind][l, j]
-                # for l in range(n):
-                #     A[ind, l*m+j] -= FN[f_ind][i, l]
-    A = A[np.any(A, axis=1)]    # filter out some useless constraints
-    return A
+    if generators_only:
+        FM = M.get_generator_matrices()
+        ExecTimes.time_step("get matrices of N")
+        FN = N.get_generator_matrices()
+    else:
+        FM = M.get_matrices_representation()
+        ExecTimes.time_step("get matrices of N")
+        FN = N.get_matrices_representation()
+    k = len(FM)
+    ExecTimes.time_step(f"assemble the constraints of dim {n*m*k} x {n*m}")
+    return kron_constraints(FM, FN)
+
+
+def kron_constraints(FM: List[np.ndarray], FN: List[np.ndarray], dtype="float64", char: int = 0):
+    """
+    constraints CH_ = 0 for H: k^m -> k^n to commute with the actions given by the matrices FM on the domain and FN on the codomain,
+    H_ being the row-major vectorization of H: for every action, the block kron(Id_n, FM^T) - kron(FN, Id_m).
+    The result is a scipy sparse CSR matrix without zero rows, or a dense array for the object dtype
+    (exact computations, not supported by scipy.sparse).
+    With char > 0, FM and FN hold int64 residues and so does the result
+    """
+    m = FM[0].shape[0] if len(FM) > 0 else 0
+    n = FN[0].shape[0] if len(FN) > 0 else 0
+    if len(FM) == 0:
+        return np.zeros((0, n*m), dtype=dtype)
+    if np.dtype(dtype) == object:
+        Id_m = np.eye(m, dtype=int).astype(object)
+        Id_n = np.eye(n, dtype=int).astype(object)
+        blocks = [np.kron(Id_n, A.T) - np.kron(B, Id_m) for A, B in zip(FM, FN)]
+        return filter_zero(np.concatenate(blocks, axis=0))
+    Id_m = scipy.sparse.identity(m, dtype=dtype, format="csr")
+    Id_n = scipy.sparse.identity(n, dtype=dtype, format="csr")
+    blocks = [
+        scipy.sparse.kron(Id_n, scipy.sparse.csr_matrix(A.T), format="csr") - scipy.sparse.kron(scipy.sparse.csr_matrix(B), Id_m, format="csr")
+        for A, B in zip(FM, FN)
+    ]
+    C = scipy.sparse.vstack(blocks, format="csr")
+    if char > 0:
+        C.data %= char
+    C.eliminate_zeros()
+    return C[C.getnnz(axis=1) > 0]
+
+
+def weight_blocks(C, weights: List[Tuple[int, ...]]) -> Iterator[Tuple[Tuple[int, ...], int, np.ndarray]]:
+    """
+    split the constraints C on unknowns of the given weights into independent blocks, each row of C
+    only involving unknowns of a single weight (raises ValueError otherwise).
+    Yields the weight, the number of unknowns of that weight and the block of constraints on them
+    (scipy sparse CSR, or dense for object arrays which stay exact, possibly without rows)
+    """
+    if len(weights) == 0:
+        return
+    distinct, column_ids = np.unique(np.array(weights, dtype=np.int64).reshape((len(weights), -1)), axis=0, return_inverse=True)
+    column_ids = column_ids.reshape(-1)
+    if not scipy.sparse.issparse(C) and np.asarray(C).dtype == object:
+        # exact entries (e.g. Fractions), not supported by scipy.sparse
+        C = filter_zero(np.asarray(C))
+        nonzero = C != 0
+        row_ids = column_ids[np.argmax(nonzero, axis=1)]
+        if np.any(nonzero & (column_ids[None, :] != row_ids[:, None])):
+            raise ValueError("the constraints are not homogeneous for the given weights")
+        for w in range(len(distinct)):
+            columns = column_ids == w
+            yield tuple(distinct[w].tolist()), int(np.count_nonzero(columns)), C[np.ix_(row_ids == w, columns)]
+        return
+    C = scipy.sparse.csr_matrix(C)
+    C.eliminate_zeros()
+    C = C[C.getnnz(axis=1) > 0]
+    row_ids = column_ids[C.indices[C.indptr[:-1]]]
+    if np.any(column_ids[C.indices] != np.repeat(row_ids, np.diff(C.indptr))):
+        raise ValueError("the constraints are not homogeneous for the given weights")
+    row_order = np.argsort(row_ids, kind="stable")
+    column_order = np.argsort(column_ids, kind="stable")
+    C = C[row_order][:, column_order]
+    row_bounds = np.searchsorted(row_ids[row_order], np.arange(len(distinct)+1))
+    column_bounds = np.searchsorted(column_ids[column_order], np.arange(len(distinct)+1))
+    for w in range(len(distinct)):
+        block = C[row_bounds[w]: row_bounds[w+1], column_bounds[w]: column_bounds[w+1]]
+        yield tuple(distinct[w].tolist()), column_bounds[w+1] - column_bounds[w], block
+
+
+def weight_character(C, weights: List[Tuple[int, ...]], char: int = 0, workers: int = None) -> Dict[Tuple[int, ...], int]:
+    """
+    dimension of each (nonzero) weight space of the kernel of the constraints C, on unknowns of the given weights.
+    The blocks of weight_blocks are independent, their ranks are computed separately (modulo char if char > 0,
+    exactly for object arrays), in a pool of workers threads if workers is given
+    """
+    def kernel_dim(item: Tuple[Tuple[int, ...], int, np.ndarray]) -> Tuple[Tuple[int, ...], int]:
+        weight, size, block = item
+        if block.shape[0] == 0:
+            return weight, int(size)
+        if char > 0:
+            rank = modular_rank(block, char)
+        elif block.dtype == object:
+            echelon = ModularEchelon(block.shape[1], 0)
+            echelon.add_matrix(block)
+            rank = echelon.rank
+        else:
+            rank = matrix_rank(block)
+        return weight, int(size - rank)
+    
+    blocks = weight_blocks(C, weights)
+    if workers is None:
+        dims = map(kernel_dim, blocks)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            dims = list(pool.map(kernel_dim, blocks))
+    return {weight: d for weight, d in dims if d > 0}
 
 
 @ExecTimes.track_time
@@ -187,13 +480,16 @@ def hom_rank(M: ModuleFromIdeal, N: ModuleFromIdeal, tol: float = None, char: in
     ExecTimes.time_step("get constraints")
     C = hom_constraints(M, N)
     if char > 0:
-        C %= char
+        ExecTimes.time_step("calculate rank modulo char")
+        return m*n - modular_rank(C, char)
     ExecTimes.time_step("calculate rank")
-    return m*n - (np.linalg.matrix_rank(C, tol=tol) if C.size > 0 else 0)
+    return m*n - matrix_rank(C, tol=tol)
 
 
 def hom(M: ModuleFromIdeal, N: ModuleFromIdeal, char: int = 0) -> np.ndarray:
-    C = hom_constraints(M, N, char=char)
+    C = hom_constraints(M, N)
+    if char > 0:
+        return modular_null_space(C, char)
     basis = null_space(C)
     return basis
     
@@ -246,31 +542,17 @@ def nested_hom_constraints(I1: PolyRingIdeal=None, I2: PolyRingIdeal=None, neste
     # (C   )
     phi = HomSpace(J2, J1, precompute_constraints=False).get_matrix_representation(lambda f: f)
     psi = HomSpace(O2, O1, precompute_constraints=False).get_matrix_representation(lambda f: f)
-    C = np.zeros((n1*m2, n1*m1 + n2*m2))
-    for i in range(n1):
-        for j in range(m2):
-            ind = i*m2 + j
-            C[ind, i*m1: i*m1+m1] += phi[:, j]
-            C[ind, n1*m1 + j: n1*m1 + n2*m2 + j: m2] -= psi[i]
-            # for l in range(m1):
-            #     C[ind, i*m1+l] += phi[l, j]
-            # for l in range(n1):
-            #     C[ind, n1*m1 + l*m2+j] -= psi[i, l]
-    C = np.concatenate(
-        [
-            np.concatenate([C1, np.zeros((C1.shape[0], n2*m2))], axis=1),
-            np.concatenate([np.zeros((C2.shape[0], n1*m1)), C2], axis=1),
-            C
-        ],
-        axis=0
-    )
-    C = C[np.any(C, axis=1)]    # filter out some useless constraints
-    return C
+    # row i*m2+j: sum_l phi[l, j] H[i, l] - sum_l psi[i, l] K[l, j], i.e. the blocks kron(Id_n1, phi^T) and -kron(psi, Id_m2)
+    C_phi = scipy.sparse.kron(scipy.sparse.identity(n1, format="csr"), scipy.sparse.csr_matrix(np.asarray(phi, dtype="float64").T), format="csr")
+    C_psi = -scipy.sparse.kron(scipy.sparse.csr_matrix(np.asarray(psi, dtype="float64")), scipy.sparse.identity(m2, format="csr"), format="csr")
+    C = scipy.sparse.bmat([[C1, None], [None, C2], [C_phi, C_psi]], format="csr")
+    C.eliminate_zeros()
+    return C[C.getnnz(axis=1) > 0]    # filter out some useless constraints
 
 
 def nested_hom_rank(I1: PolyRingIdeal, I2: PolyRingIdeal, tol: float = None) -> int:
     nested_modules = get_nested_modules(I1, I2)
     k, m1, m2, n1, n2 = nested_modules.dims()
     C = nested_hom_constraints(nested_modules=nested_modules)
-    return n1*m1 + n2*m2 - np.linalg.matrix_rank(C, tol=tol)
+    return n1*m1 + n2*m2 - matrix_rank(C, tol=tol)
 
@@ -0,0 +1,350 @@
+from __future__ import annotations
+from .common import densify
+from fractions import Fraction
+from typing import Dict, List, Tuple
+import math
+import numpy as np
+import scipy.sparse
+import sympy
+
+
+MODULAR_PRIME = 2147483647     # 2^31 - 1, products of two residues fit in an int64
+MAX_DENOMINATOR = 10**6     # floating point entries are read as the closest fraction with a denominator below this bound
+FLOAT_TOLERANCE = 64*np.finfo(float).eps      # relative distance from a floating point entry to that fraction above which it is not a rounded fraction
+SPARSE_DENSITY = 0.1    # matrices with fewer nonzero entries than this proportion are eliminated as sparse rows
+
+
+def check_characteristic(char: int):
+    if char == 0:
+        return
+    if char >= 2**31 or not sympy.isprime(char):
+        raise ValueError(f"the characteristic must be 0 or a prime below 2^31, got {char}")
+
+
+def float_to_fraction(x: float) -> Fraction:
+    """
+    the fraction a floating point number x is the rounding of: the closest one with a denominator below MAX_DENOMINATOR.
+    Raises ValueError if x is not within FLOAT_TOLERANCE of it (its exact value is then lost, compute with Scalar.FRACTION)
+    """
+    x = float(x)
+    fraction = Fraction(x).limit_denominator(MAX_DENOMINATOR)
+    if abs(x - fraction) > FLOAT_TOLERANCE * max(1., abs(x)):
+        raise ValueError(f"{x} is not a rounded fraction with a denominator below {MAX_DENOMINATOR}, it has no exact residue")
+    return fraction
+
+
+def to_modular(A: np.ndarray, p: int = MODULAR_PRIME) -> np.ndarray:
+    """
+    residues modulo p (int64 array) of a matrix of integers, fractions or floating point numbers,
+    the latter being first read as fractions (see float_to_fraction).
+    Raises ZeroDivisionError if p divides a denominator, ValueError if a floating point number is not a rounded fraction
+    """
+    if scipy.sparse.issparse(A):
+        A = scipy.sparse.csr_matrix(A)
+        return scipy.sparse.csr_matrix((to_modular(A.data, p), A.indices, A.indptr), shape=A.shape)
+    A = np.asarray(A)
+    if A.dtype.kind in "iu":
+        return A.astype(np.int64) % p
+    if A.dtype.kind == "c":
+        raise TypeError("complex matrices cannot be reduced modulo p")
+    if A.dtype.kind == "f" and np.all(A == np.round(A)) and (A.size == 0 or np.max(np.abs(A)) < 2**53):
+        return A.astype(np.int64) % p
+
+    def residue(x) -> int:
+        if not isinstance(x, (int, Fraction)):
+            x = float_to_fraction(x)
+        x = Fraction(x)
+        if x.denominator % p == 0:
+            raise ZeroDivisionError(f"the prime {p} divides the denominator of {x}")
+        return x.numerator * pow(x.denominator, -1, p) % p
+
+    R = np.zeros(A.size, dtype=np.int64)
+    flat = A.ravel()
+    nonzeros = np.flatnonzero(flat != 0)    # action matrices are mostly zeros
+    R[nonzeros] = [residue(x) for x in flat[nonzeros]]
+    return R.reshape(A.shape)
+
+
+def modular_row_echelon(A: np.ndarray, p: int = MODULAR_PRIME, reduced: bool = True) -> Tuple[np.ndarray, List[int]]:
+    """
+    row echelon form modulo p (reduced by default) of the int64 residue matrix A, without its zero rows,
+    and the list of pivot columns. Rows that become zero are dropped as the elimination goes,
+    so that tall constraint matrices shrink to their rank
+    """
+    A = np.array(A, dtype=np.int64) % p
+    pivots = []
+    r = 0
+    for c in range(A.shape[1]):
+        if r == A.shape[0]:
+            break
+        nonzeros = np.flatnonzero(A[r:, c])
+        if nonzeros.size == 0:
+            continue
+        if nonzeros[0] != 0:
+            A[[r, r + nonzeros[0]]] = A[[r + nonzeros[0], r]]
+        A[r, c:] = A[r, c:] * pow(int(A[r, c]), -1, p) % p
+        below = r + 1 + np.flatnonzero(A[r+1:, c])
+        if below.size > 0:
+            A[below, c:] = (A[below, c:] - np.outer(A[below, c], A[r, c:]) % p) % p
+        pivots.append(c)
+        r += 1
+        if r % 32 == 0:
+            remaining = A[r:]
+            A = np.concatenate([A[:r], remaining[remaining.any(axis=1)]])
+    A = A[:r]
+    if reduced:
+        for i in range(r-1, 0, -1):
+            c = pivots[i]
+            above = np.flatnonzero(A[:i, c])
+            if above.size > 0:
+                A[above, c:] = (A[above, c:] - np.outer(A[above, c], A[i, c:]) % p) % p
+    return A, pivots
+
+
+class ModularEchelon:
+    """
+    Rows in echelon form modulo p, kept sparse (dictionaries column -> nonzero residue) and filled one row at a time.
+    Each stored row is normalized to 1 at its pivot, its smallest column, and no two rows share a pivot.
+    Constraint matrices are very sparse and, adding the sparsest rows first, the stored rows stay sparse.
+    The elimination is done in Python on purpose: a row update costs the length of the pivot row,
+    while vectorized int64 updates cost the number of columns (matrices denser than SPARSE_DENSITY are eliminated that way).
+    With p = 0 the computations are exact over the rationals (entries are then ints or Fractions).
+    """
+
+    def __init__(self, n_columns: int, p: int = MODULAR_PRIME):
+        self.n_columns = n_columns
+        self.p = p
+        self.rows: Dict[int, Dict[int, int]] = {}  # pivot column -> row
+
+    @property
+    def rank(self) -> int:
+        return len(self.rows)
+
+    @property
+    def pivots(self) -> List[int]:
+        return sorted(self.rows)
+
+    def reduce(self, row: Dict[int, int]) -> Dict[int, int]:
+        """reduce (a copy of) the row until its smallest column is not a pivot, or it is zero"""
+        p = self.p
+        row = dict(row)
+        while row:
+            c = min(row)
+            pivot_row = self.rows.get(c)
+            if pivot_row is None:
+                return row
+            f = row[c]
+            for k, v in pivot_row.items():
+                w = row.get(k, 0) - f*v
+                if p:
+                    w %= p
+                if w:
+                    row[k] = w
+                else:
+                    row.pop(k, None)
+        return row
+
+    def add_row(self, row: Dict[int, int]) -> bool:
+        """add a row (of residues), return whether it was independent from the previous ones"""
+        row = self.reduce(row)
+        if not row:
+            return False
+        c = min(row)
+        if self.p:
+            inv = pow(row[c], -1, self.p)
+            self.rows[c] = {k: v*inv % self.p for k, v in row.items()}
+        else:
+            inv = 1 / Fraction(row[c])
+            self.rows[c] = {k: v*inv for k, v in row.items()}
+        return True
+
+    def add_matrix(self, A, offset: int = 0):
+        """
+        add the rows of a matrix of residues (dense or scipy sparse), sparsest first.
+        The columns of A are those of the echelon starting from offset
+        """
+        if not scipy.sparse.issparse(A) and np.asarray(A).dtype == object:
+            A = np.asarray(A)
+            rows = [{offset + int(k): x for k, x in zip(np.flatnonzero(a != 0), a[a != 0])} for a in A]
+            for row in sorted(rows, key=len):
+                if row:
+                    self.add_row(row)
+            return
+        A = scipy.sparse.csr_matrix(A)
+        A.eliminate_zeros()
+        lengths = np.diff(A.indptr)
+        data = A.data % self.p if self.p else A.data
+        for i in np.argsort(lengths, kind="stable"):
+            if lengths[i] == 0:
+                continue
+            start, end = A.indptr[i], A.indptr[i+1]
+            self.add_row(dict(zip((A.indices[start:end] + offset).tolist(), data[start:end].tolist())))
+
+    def null_space(self) -> np.ndarray:
+        """basis of the vectors orthogonal to all the rows, as the columns of an int64 array of residues (of Fractions if p = 0)"""
+        p = self.p
+        reduced: Dict[int, Dict[int, int]] = {}
+        for c in sorted(self.rows, reverse=True):
+            # rows of larger pivots are already free of the other pivot columns
+            row = dict(self.rows[c])
+            for k in [k for k in row if k != c and k in reduced]:
+                f = row.pop(k)
+                for l, v in reduced[k].items():
+                    if l == k:
+                        continue
+                    w = row.get(l, 0) - f*v
+                    if p:
+                        w %= p
+                    if w:
+                        row[l] = w
+                    else:
+                        row.pop(l, None)
+            reduced[c] = row
+        free = [c for c in range(self.n_columns) if c not in self.rows]
+        free_index = {c: j for j, c in enumerate(free)}
+        K = np.zeros((self.n_columns, len(free)), dtype=np.int64 if p else object)
+        if not p:
+            K[:] = Fraction(0)
+        K[free, np.arange(len(free))] = 1 if p else Fraction(1)
+        for c, row in reduced.items():
+            for k, v in row.items():
+                if k != c:
+                    K[c, free_index[k]] = -v % p if p else -v
+        return K
+
+
+def _is_sparse(A) -> bool:
+    size = A.shape[0]*A.shape[1]
+    nonzeros = A.nnz if scipy.sparse.issparse(A) else np.count_nonzero(A)
+    return nonzeros <= SPARSE_DENSITY*size
+
+
+def modular_rank(A: np.ndarray, p: int = MODULAR_PRIME) -> int:
+    """rank of A modulo p, A being dense or scipy sparse (sparse matrices are eliminated row by row with ModularEchelon)"""
+    if A.shape[0] == 0 or A.shape[1] == 0:
+        return 0
+    A = to_modular(A, p)
+    if _is_sparse(A):
+        echelon = ModularEchelon(A.shape[1], p)
+        echelon.add_matrix(A)
+        return echelon.rank
+    _, pivots = modular_row_echelon(densify(A), p, reduced=False)
+    return len(pivots)
+
+
+def _modular_kernel(A: np.ndarray, p: int) -> Tuple[np.ndarray, List[int]]:
+    """kernel of the residue matrix A modulo p (see modular_null_space) and the pivot columns of its row echelon form"""
+    n = A.shape[1]
+    if A.shape[0] > 0 and _is_sparse(A):
+        echelon = ModularEchelon(n, p)
+        echelon.add_matrix(A)
+        return echelon.null_space(), echelon.pivots
+    R, pivots = modular_row_echelon(densify(A), p)
+    pivot_set = set(pivots)
+    free = [c for c in range(n) if c not in pivot_set]
+    K = np.zeros((n, len(free)), dtype=np.int64)
+    K[free, np.arange(len(free))] = 1
+    if len(pivots) > 0:
+        K[pivots] = (-R[:, free]) % p
+    return K, pivots
+
+
+def modular_null_space(A: np.ndarray, p: int = MODULAR_PRIME) -> np.ndarray:
+    """
+    basis of the kernel of A modulo p, as the columns of an int64 array of residues.
+    The basis is the canonical one: the identity on the free columns of the reduced row echelon form of A
+    """
+    K, _ = _modular_kernel(to_modular(A, p), p)
+    return K
+
+
+def rational_reconstruction(a: int, m: int) -> Fraction:
+    """
+    the fraction r/s with |r|, s <= sqrt(m/2) congruent to a modulo m (extended Euclid on m and a),
+    None if there is none
+    """
+    bound = math.isqrt(m // 2)
+    r0, r1 = m, a % m
+    s0, s1 = 0, 1
+    while r1 > bound:
+        q = r0 // r1
+        r0, r1 = r1, r0 - q*r1
+        s0, s1 = s1, s0 - q*s1
+    if s1 == 0 or abs(s1) > bound or math.gcd(r1, abs(s1)) != 1:
+        return None
+    return Fraction(r1, s1)
+
+
+def _integer_rows(A) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    nonzero entries (rows, columns, values) of A after multiplying each row by the common denominator of its entries,
+    floating point entries being read as fractions (see float_to_fraction). The kernel is unchanged
+    """
+    if scipy.sparse.issparse(A):
+        A = scipy.sparse.coo_matrix(A)
+        rows, cols, values = A.row, A.col, A.data
+    else:
+        A = np.asarray(A)
+        rows, cols = np.nonzero(A != 0)
+        values = A[rows, cols]
+    if A.dtype.kind == "c":
+        raise TypeError("complex matrices have no rational kernel")
+    values = [x if isinstance(x, (int, Fraction)) else float_to_fraction(x) for x in values.tolist()]
+    denominators: Dict[int, int] = {}
+    for i, x in zip(rows.tolist(), values):
+        if isinstance(x, Fraction):
+            denominators[i] = math.lcm(denominators.get(i, 1), x.denominator)
+    values = np.array([int(x*denominators.get(i, 1)) for i, x in zip(rows.tolist(), values)], dtype=object)
+    return rows, cols, values
+
+
+def _is_rational_kernel(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, K: np.ndarray) -> bool:
+    """exact check that the integer matrix given by its nonzero entries kills the columns of K (Fractions)"""
+    if len(rows) == 0 or K.shape[1] == 0:
+        return True
+    # clear the denominators of each column, the check is then done on Python integers
+    scale = np.array([math.lcm(*(x.denominator for x in column)) for column in K.T], dtype=object)
+    K = np.array([[x.numerator * (d // x.denominator) for x, d in zip(row, scale)] for row in K], dtype=object)
+    order = np.argsort(rows, kind="stable")
+    rows, cols, values = rows[order], cols[order], values[order]
+    products = K[cols] * values[:, None]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    return not np.add.reduceat(products, starts, axis=0).any()
+
+
+def exact_null_space(A: np.ndarray, p: int = MODULAR_PRIME) -> np.ndarray:
+    """
+    basis of the kernel of A over the rationals, as the columns of an array of Fractions.
+    The canonical kernel basis (identity on the free columns) is computed modulo p and the next primes below it,
+    skipping the unlucky ones for which the reduced row echelon form differs, the results are combined
+    with the Chinese remainder theorem and read back as fractions by rational reconstruction.
+    Primes are added until the reconstructed basis is checked to be exactly in the kernel of A
+    """
+    n, m = A.shape
+    if n == 0:
+        return np.eye(m, dtype=int).astype(object) + Fraction()
+    rows, cols, values = _integer_rows(A)
+    best_pivots = None
+    modulus = 1
+    K = None
+    while True:
+        residues = np.array([int(x % p) for x in values], dtype=np.int64)
+        K_p, pivots = _modular_kernel(scipy.sparse.csr_matrix((residues, (rows, cols)), shape=(n, m)), p)
+        # a prime is unlucky when the rank drops, or the pivots move right, compared to the rationals
+        if best_pivots is None or (len(pivots), [-c for c in pivots]) > (len(best_pivots), [-c for c in best_pivots]):
+            best_pivots, modulus, K = pivots, p, K_p.astype(object)
+        elif pivots == best_pivots:
+            K = K + modulus * ((K_p.astype(object) - K) * pow(modulus, -1, p) % p)
+            modulus *= p
+        else:
+            p = sympy.prevprime(p)
+            continue
+        reconstructed = np.empty(K.shape, dtype=object)
+        for index, a in np.ndenumerate(K):
+            reconstructed[index] = rational_reconstruction(a, modulus)
+            if reconstructed[index] is None:
+                break
+        else:
+            if _is_rational_kernel(rows, cols, values, reconstructed):
+                return reconstructed
+        p = sympy.prevprime(p)
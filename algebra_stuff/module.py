@@ -29,11 +29,26 @@ class FiniteDimRing:
 class QuotientRing(FiniteDimRing):
     def __init__(self, ideal: PolyRingIdeal):
         self.ideal = ideal
+        self._structure_constants: np.ndarray = None
         super().__init__(ideal.order, ideal.symbols)
     
     def _get_basis(self) -> List[GroebnerPolynomial]:
         return self.ideal.degree()
     
+    def structure_constants(self) -> np.ndarray:
+        """k x k x k tensor T, T[a, :, b] are the coordinates of the product of the basis elements a and b"""
+        if self._structure_constants is None:
+            self._structure_constants = self.ideal.action_tensor([g.lm for g in self.basis], self.basis)
+        return self._structure_constants
+    
+    def to_basis(self, f: GroebnerPolynomial) -> List[Scalar]:
+        f = GroebnerPolynomial.make(f, order=self.order, symbols=self.symbols)
+        return self.ideal.coordinates(f).tolist()
+    
+    def from_basis(self, vect: List[Scalar]) -> GroebnerPolynomial:
+        terms = [MonomialWithCoef(c, g.lm) for c, g in zip(vect, self.basis) if c != 0]
+        return GroebnerPolynomial(terms, self.symbols, self.order)
+    
     def __eq__(self, other: FiniteDimRing):
         return isinstance(other, QuotientRing) and self.ideal == other.ideal
     
@@ -89,6 +104,15 @@ class Module:
         # for every g in the basis of the base ring, compute the matrix representation of the transformation induced by g
         return [self.get_matrix_representation(lambda f: g*f, dtype=dtype) for g in self.base_ring.basis]
     
+    def get_generator_matrices(self, dtype="float64") -> List[np.ndarray]:
+        # matrices of the multiplication by the variables, which generate the base ring as an algebra
+        variables = [GroebnerPolynomial.make(s, order=self.base_ring.order, symbols=self.base_ring.symbols) for s in self.base_ring.symbols]
+        return [self.get_matrix_representation(lambda f: x*f, dtype=dtype) for x in variables]
+    
+    def weights(self) -> List[Tuple[int, ...]]:
+        # weights of the basis under the action of the torus scaling the variables, None if the basis is not made of weight vectors
+        return None
+    
     def construct_endo_matrix(self):
         n = len(self.basis)
         k = len(self.base_ring.basis)
@@ -110,23 +134,69 @@ class ModuleFromIdeal(Module):
         self.structure_ideal = ideal
         super().__init__(base_ring)
     
+    def _cache_parts(self) -> tuple:
+        # what the module structure depends on, besides the base ring
+        return (type(self).__name__, self.structure_ideal.cache_key())
+    
+    def cache_key(self) -> str:
+        """key of the module in IDEAL_CACHE, None if the base ring is not a quotient ring"""
+        if not isinstance(self.base_ring, QuotientRing):
+            return None
+        return IdealCache.make_key(*self._cache_parts(), self.base_ring.ideal.cache_key())
+    
+    def weights(self) -> List[Tuple[int, ...]]:
+        """
+        for a monomial structure ideal and a basis of monomials, their exponents:
+        the weights of the basis under the action of the torus scaling the variables (None otherwise)
+        """
+        if not self.structure_ideal.is_monomial or any(len(f) != 1 for f in self.basis):
+            return None
+        return [f.lm.degrees for f in self.basis]
+    
+    def get_matrices_representation(self, dtype="float64") -> List[np.ndarray]:
+        return self._cached_action_matrices("matrices", dtype, generators_only=False)
+    
+    def get_generator_matrices(self, dtype="float64") -> List[np.ndarray]:
+        return self._cached_action_matrices("generator_matrices", dtype, generators_only=True)
+    
+    def _cached_action_matrices(self, name: str, dtype, generators_only: bool) -> List[np.ndarray]:
+        key = self.cache_key()
+        if key is None:
+            if generators_only:
+                return super().get_generator_matrices(dtype=dtype)
+            return super().get_matrices_representation(dtype=dtype)
+        field = f"{name}_{np.dtype(dtype)}"
+        matrices = IDEAL_CACHE.get(key, field)
+        if matrices is None:
+            matrices = list(self.action_tensor(generators_only=generators_only).astype(dtype))
+            IDEAL_CACHE.set(key, field, matrices)
+        return [M.copy() for M in matrices]
+    
+    def action_tensor(self, generators_only: bool = False) -> np.ndarray:
+        """
+        k x n x n tensor T, T[a, :, b] are the coordinates of g_a*f_b, for (g_a) the basis of the base ring
+        (standard monomials of a quotient ring) and (f_b) the basis of the module.
+        With generators_only, (g_a) are the variables instead (k is then the number of variables).
+        It is read off the normal forms in the quotient by the structure ideal, no polynomial is reduced
+        """
+        if generators_only:
+            n_vars = len(self.structure_ideal.symbols)
+            multipliers = [Monomial(self.structure_ideal.symbols, [int(j == i) for j in range(n_vars)]) for i in range(n_vars)]
+        else:
+            multipliers = [g.lm for g in self.base_ring.basis]
+        T = self.structure_ideal.action_tensor(multipliers, self.basis)
+        k, n_quotient, n = T.shape
+        T = self._from_quotient_coordinates(T.transpose((1, 0, 2)).reshape((n_quotient, k*n)))
+        return T.reshape((n, k, n)).transpose((1, 0, 2))
+    
+    def _from_quotient_coordinates(self, V: np.ndarray) -> np.ndarray:
+        # coordinates in the basis of the module of elements given by their coordinates (columns of V) in the quotient by the structure ideal
+        return V
+    
     def to_basis(self, f: GroebnerPolynomial) -> List[Scalar]:
         f = GroebnerPolynomial.make(f, order=self.structure_ideal.order, symbols=self.structure_ideal.symbols)
-        orig_f = f
-        f = self.structure_ideal.reduced(f)
-        coefs = []
-        for g in self.basis:
-            c = 0
-            if f.lm == g.lm:
-            #if f.lm.is_multiple(g.lm):
-                c = f.lc/g.lc
-                f = f - c*g
-            coefs.append(c)
-        if not f.is_zero():
-            print("ERROR: NOT ZERO IN BASIS", orig_f, "  ||  ", f)
-            additional_coefs = self.to_basis(f)
-            coefs = list_add(coefs, additional_coefs)
-        return coefs
+        v = self.structure_ideal.coordinates(f)
+        return self._from_quotient_coordinates(v.reshape((-1, 1)))[:, 0].tolist()
 
 
 class RingQuotientModule(ModuleFromIdeal):
@@ -137,6 +207,10 @@ class RingQuotientModule(ModuleFromIdeal):
     def _get_basis(self) -> List[GroebnerPolynomial]:
         return self.structure_ideal.degree()
     
+    def from_basis(self, vect: List[Scalar]) -> GroebnerPolynomial:
+        terms = [MonomialWithCoef(c, g.lm) for c, g in zip(vect, self.basis) if c != 0]
+        return GroebnerPolynomial(terms, self.structure_ideal.symbols, self.structure_ideal.order)
+    
     def contains(self, f: GroebnerPolynomial) -> bool:
         return True
     
@@ -155,11 +229,32 @@ class IdealQuotientModule(ModuleFromIdeal):
         if not top_ideal.contains_ideal(bot_ideal):
             raise ValueError
         self.top_ideal = top_ideal
+        self._basis_coords: Tuple[np.ndarray, List[int]] = None
         super().__init__(base_ring, bot_ideal)
     
+    def _cache_parts(self) -> tuple:
+        return super()._cache_parts() + (self.top_ideal.cache_key(),)
+    
     def _get_basis(self) -> List[GroebnerPolynomial]:
         return self.structure_ideal.degree_for_base(base_ideal=self.top_ideal)
     
+    def _basis_coordinates(self) -> Tuple[np.ndarray, List[int]]:
+        # coordinates of the basis in the quotient by the structure ideal, and the position of their leading monomials,
+        # the coordinates of the basis are lower triangular on these rows
+        if self._basis_coords is None:
+            ideal = self.structure_ideal
+            W = ideal._zeros((ideal.colength(), self.dim))
+            for j, f in enumerate(self.basis):
+                W[:, j] = ideal.coordinates(f)
+            pivots = [ideal.staircase_index()[f.lm] for f in self.basis]
+            self._basis_coords = (W, pivots)
+        return self._basis_coords
+    
+    def _from_quotient_coordinates(self, V: np.ndarray) -> np.ndarray:
+        # only the rows of the leading monomials of the basis are used, V is assumed to lie in the span of the basis
+        W, pivots = self._basis_coordinates()
+        return solve_lower_triangular(W[pivots], V[pivots])
+    
     def contains(self, f: GroebnerPolynomial) -> bool:
         return self.top_ideal.contains(f)
     
@@ -1,13 +1,14 @@
 from __future__ import annotations
 from sympy import Symbol
 import sympy
-from typing import TYPE_CHECKING, List, Union
+from typing import TYPE_CHECKING, List, Dict, Tuple, Union
 from fractions import Fraction
+import operator
 import algebra_stuff.groebner_polynomial as gb  # real import
 if TYPE_CHECKING:   # fake import, only for annotations
     from .groebner_polynomial import GroebnerPolynomial
 #from .common import *
-from .common import Params, ExecTimes, init_globals, focus_poly_ring, focus_base_ring, infer_poly_ring, infer_base_ring, get_global_scope, set_global_scope, revert_global_scope, filter_zero, list_add, null_space, exact_null_space, decide_dtype
+from .common import Params, ExecTimes, init_globals, focus_poly_ring, focus_base_ring, infer_poly_ring, infer_base_ring, get_global_scope, set_global_scope, revert_global_scope, filter_zero, densify, list_add, reduced_row_echelon, solve_lower_triangular, triangular_factor, matrix_rank, null_space, OrthonormalRowSpace, decide_dtype
 
 # class GroebnerPolynomial:
 #     def __new__(self, *args, **kwargs):
@@ -15,27 +16,119 @@ from .common import Params, ExecTimes, init_globals, focus_poly_ring, focus_base
 
 
 class MonomialOrder:
-    def eval(self, monomial: Monomial):
-        pass
+    """
+    A monomial order is given by an integer matrix whose rows are compared lexicographically
+    after multiplication with the exponent vector.
+    The rows are packed into a single integer key, each one on EXPONENT_BITS bits, which reduces to one
+    integer weight per variable: the key of a monomial is the dot product of its exponents with these weights.
+    Keys are linear in the exponents, so the key of a product is the sum of the keys.
+    Valid as long as every row evaluates to less than 2^(EXPONENT_BITS-1) in absolute value.
+    """
+    EXPONENT_BITS = 32
+    
+    def __init__(self):
+        self._weights: Dict[int, Tuple[int, ...]] = {}
+    
+    def matrix(self, n: int) -> List[List[int]]:
+        """rows of the order matrix for n variables"""
+        raise NotImplementedError
+    
+    def weights(self, n: int) -> Tuple[int, ...]:
+        weights = self._weights.get(n)
+        if weights is None:
+            rows = self.matrix(n)
+            shifts = [self.EXPONENT_BITS*(len(rows)-1-i) for i in range(len(rows))]
+            weights = tuple(sum(row[j] << shift for row, shift in zip(rows, shifts)) for j in range(n))
+            self._weights[n] = weights
+        return weights
+    
+    def key(self, monomial: Monomial) -> int:
+        # cached on the monomial for the latest order used (see Monomial)
+        if monomial._key_order is self:
+            return monomial._key
+        degrees = monomial._degrees
+        key = sum(map(operator.mul, degrees, self.weights(len(degrees))))
+        monomial._key = key
+        monomial._key_order = self
+        return key
+    
+    def eval(self, monomial: Monomial) -> int:
+        return self.key(monomial)
     
     def eq(self, m1: Monomial, m2: Monomial) -> bool:
-        return self.eval(m1) == self.eval(m2)
+        return self.key(m1) == self.key(m2)
     
     def gt(self, m1: Monomial, m2: Monomial) -> bool:
-        return self.eval(m1) > self.eval(m2)
+        return self.key(m1) > self.key(m2)
     
     def lt(self, m1: Monomial, m2: Monomial) -> bool:
-        return self.eval(m1) < self.eval(m2)
+        return self.key(m1) < self.key(m2)
 
 
 class LexicographicOrder(MonomialOrder):
-    def eval(self, monomial: Monomial):
-        return monomial.degrees
+    def matrix(self, n: int) -> List[List[int]]:
+        return [[int(i == j) for j in range(n)] for i in range(n)]
+    
+    def __repr__(self):
+        return "lex"
 
 
 class GradedReverseLexicographicOrder(MonomialOrder):
-    def eval(self, monomial: Monomial):
-        return (monomial.total_degree(), [-monomial.degrees[i] for i in range(monomial.var_count()-1, -1, -1)])
+    def matrix(self, n: int) -> List[List[int]]:
+        # total degree, then smallest exponent in the last variable, ...
+        # comparing the first variable is redundant once the total degree and all the others are equal
+        return [[1]*n] + [[-int(j == i) for j in range(n)] for i in range(n-1, 0, -1)]
+    
+    def __repr__(self):
+        return "degrevlex"
+
+
+class WeightOrder(MonomialOrder):
+    """compare the weighted degrees first, then break ties with another order"""
+    
+    def __init__(self, weight_vector: List[int], tie_break: MonomialOrder = None):
+        super().__init__()
+        if any(not isinstance(w, int) for w in weight_vector):
+            raise TypeError("weights must be integers")
+        self.weight_vector = list(weight_vector)
+        self.tie_break = tie_break if tie_break is not None else GradedReverseLexicographicOrder()
+    
+    def matrix(self, n: int) -> List[List[int]]:
+        weight_vector = self.weight_vector[:n] + [0]*(n-len(self.weight_vector))
+        return [weight_vector] + self.tie_break.matrix(n)
+    
+    def __repr__(self):
+        return f"weight({self.weight_vector}, {self.tie_break!r})"
+
+
+class BlockOrder(MonomialOrder):
+    """
+    Product order: variables are split into consecutive blocks, monomials are compared on the first block,
+    then on the second one in case of equality, etc.
+    """
+    
+    def __init__(self, block_sizes: List[int], orders: List[MonomialOrder] = None):
+        super().__init__()
+        if orders is None:
+            orders = [GradedReverseLexicographicOrder() for _ in block_sizes]
+        if len(orders) != len(block_sizes):
+            raise ValueError("one order is needed per block")
+        self.block_sizes = list(block_sizes)
+        self.orders = orders
+    
+    def matrix(self, n: int) -> List[List[int]]:
+        if sum(self.block_sizes) != n:
+            raise ValueError(f"blocks of sizes {self.block_sizes} do not cover {n} variables")
+        rows = []
+        start = 0
+        for size, order in zip(self.block_sizes, self.orders):
+            for block_row in order.matrix(size):
+                rows.append([0]*start + block_row + [0]*(n-start-size))
+            start += size
+        return rows
+    
+    def __repr__(self):
+        return f"block({self.block_sizes}, {self.orders})"
 
 
 lex = LexicographicOrder()
@@ -74,30 +167,115 @@ class Scalar:
         raise ValueError
     
     
+class SymbolContext:
+    """
+    Symbols of a polynomial ring, shared by all the monomials over these symbols.
+    Contexts are interned: building a context from equal symbols always gives back the same object,
+    so that monomials can check that they live in the same ring by identity.
+    """
+    __slots__ = ("symbols", "index")
+    _contexts: Dict[tuple, SymbolContext] = {}
+    _last: tuple = (None, None)     # (symbols object, context) of the latest lookup
+    
+    def __init__(self, symbols: Tuple[Symbol, ...]):
+        self.symbols = symbols
+        self.index = {s: i for i, s in enumerate(symbols)}
+    
+    @classmethod
+    def get(cls, symbols: Union[List[Symbol], SymbolContext]) -> SymbolContext:
+        if isinstance(symbols, SymbolContext):
+            return symbols
+        last_symbols, last_context = cls._last
+        if symbols is last_symbols:
+            return last_context
+        key = tuple(symbols)
+        context = cls._contexts.get(key)
+        if context is None:
+            context = cls(key)
+            cls._contexts[key] = context
+        cls._last = (symbols, context)
+        return context
+    
+    def __len__(self):
+        return len(self.symbols)
+    
+    def __reduce__(self):
+        return (SymbolContext.get, (self.symbols,))
+    
+    def __copy__(self):
+        return self
+    
+    def __deepcopy__(self, memo):
+        return self
+
+
 class Monomial:
+    """
+    Monomial, stored as a tuple of exponents over a shared SymbolContext.
+    Its value (exponents, total degree, hash, equality) never changes, the total degree and the hash are computed once at creation.
+    It is not immutable though: _key and _key_order cache the sort key of the latest order used. They are written by
+    MonomialOrder.key, and by the polynomial arithmetic which gets the keys of products by adding keys, and only read back
+    by the order that wrote them. Sharing a monomial between orders only costs recomputing its key
+    """
+    __slots__ = ("_ctx", "_degrees", "_total", "_hash", "_key", "_key_order")
     superscript_numbers = {0: '⁰', 1: '¹', 2: '²', 3: '³', 4: '⁴', 5: '⁵', 6: '⁶', 7: '⁷', 8: '⁸', 9: '⁹'}
     
-    def __init__(self, symbols: List[Symbol], degrees: List[int]):
+    def __init__(self, symbols: Union[List[Symbol], SymbolContext], degrees: List[int]):
         # make sure degrees has the same size as symbols
-        degrees = degrees[:len(symbols)]
-        degrees.extend([0]*(len(symbols)-len(degrees)))
+        ctx = SymbolContext.get(symbols)
+        n = len(ctx.symbols)
+        degrees = tuple(degrees[:n])
+        if len(degrees) < n:
+            degrees += (0,)*(n-len(degrees))
         
-        self.symbols = symbols
-        self.degrees = degrees
+        self._ctx = ctx
+        self._degrees = degrees
+        self._total = sum(degrees)
+        self._hash = hash(degrees)
+        self._key_order = None  # order for which _key was computed
+    
+    @classmethod
+    def _make(cls, ctx: SymbolContext, degrees: Tuple[int, ...], total: int) -> Monomial:
+        # fast constructor for internal use: no validation of the arguments
+        monomial = object.__new__(cls)
+        monomial._ctx = ctx
+        monomial._degrees = degrees
+        monomial._total = total
+        monomial._hash = hash(degrees)
+        monomial._key_order = None
+        return monomial
+    
+    @classmethod
+    def one(cls, symbols: Union[List[Symbol], SymbolContext]) -> Monomial:
+        ctx = SymbolContext.get(symbols)
+        return cls._make(ctx, (0,)*len(ctx.symbols), 0)
+    
+    @property
+    def degrees(self) -> Tuple[int, ...]:
+        return self._degrees
+    
+    @property
+    def symbols(self) -> Tuple[Symbol, ...]:
+        return self._ctx.symbols
+    
+    @property
+    def context(self) -> SymbolContext:
+        return self._ctx
     
     def total_degree(self) -> int:
-        return sum(self.degrees)
+        return self._total
     
     def var_count(self) -> int:
-        return len(self.symbols)
+        return len(self._degrees)
     
     def __eq__(self, other: Monomial):
-        return self.symbols == other.symbols and self.degrees == other.degrees
+        if not isinstance(other, Monomial):
+            return NotImplemented
+        return self._ctx is other._ctx and self._degrees == other._degrees
     
     def __mul__(self, other: Union[Monomial, MonomialWithCoef, GroebnerPolynomial, Scalar]):
         if isinstance(other, Monomial):
-            degrees = [d1+d2 for d1, d2 in zip(self.degrees, other.degrees)]
-            return Monomial(self.symbols, degrees)
+            return Monomial._make(self._ctx, tuple(map(operator.add, self._degrees, other._degrees)), self._total + other._total)
         if isinstance(other, MonomialWithCoef):
             return MonomialWithCoef(coef=1, monomial=self) * other
         if isinstance(other, gb.GroebnerPolynomial):
@@ -111,49 +289,54 @@ class Monomial:
         return self * other
     
     def __truediv__(self, other: Monomial):
-        degrees = []
-        for d1, d2 in zip(self.degrees, other.degrees):
-            if d1 < d2:
-                raise ValueError("the first monomial is not a multiple of the second")
-            degrees.append(d1-d2)
-        return Monomial(self.symbols, degrees)
+        degrees = tuple(map(operator.sub, self._degrees, other._degrees))
+        if any(d < 0 for d in degrees):
+            raise ValueError("the first monomial is not a multiple of the second")
+        return Monomial._make(self._ctx, degrees, self._total - other._total)
     
     def gcd(self, other: Monomial):
-        degrees = [min(d1, d2) for d1, d2 in zip(self.degrees, other.degrees)]
-        return Monomial(self.symbols, degrees)
+        degrees = tuple(map(min, self._degrees, other._degrees))
+        return Monomial._make(self._ctx, degrees, sum(degrees))
     
     def lcm(self, other: Monomial):
-        degrees = [max(d1, d2) for d1, d2 in zip(self.degrees, other.degrees)]
-        return Monomial(self.symbols, degrees)
+        degrees = tuple(map(max, self._degrees, other._degrees))
+        return Monomial._make(self._ctx, degrees, sum(degrees))
     
     def is_multiple(self, other: Monomial):
-        return all(d1 >= d2 for d1, d2 in zip(self.degrees, other.degrees))
+        if self._total < other._total:
+            return False
+        return all(map(operator.ge, self._degrees, other._degrees))
     
     def is_constant(self) -> bool:
-        return all(d == 0 for d in self.degrees)
+        return self._total == 0
     
     def __repr__(self):
         if self.is_constant():
             return "1"
         exp_format = lambda e: "" if e == 1 else "".join(map(Monomial.superscript_numbers.get, base_decomp(e)))
-        return "".join(repr(x) + exp_format(e) for x, e in zip(self.symbols, self.degrees) if e > 0)
+        return "".join(repr(x) + exp_format(e) for x, e in zip(self.symbols, self._degrees) if e > 0)
     
     def __hash__(self):
-        def enum():
-            for symb, d in zip(self.symbols, self.degrees):
-                for _ in range(d):
-                    yield symb
-        
-        t = tuple(hash(symb.name) for symb in enum())
-        return hash(t)
+        return self._hash
+    
+    def __reduce__(self):
+        return (Monomial, (self._ctx, self._degrees))
+    
+    def __copy__(self):
+        return self
+    
+    def __deepcopy__(self, memo):
+        return self
     
     def macaulay2_repr(self):
         if self.is_constant():
             return "1"
-        return "*".join(repr(x) + "^" + repr(e) for x, e in zip(self.symbols, self.degrees) if e > 0)
+        return "*".join(repr(x) + "^" + repr(e) for x, e in zip(self.symbols, self._degrees) if e > 0)
 
 
 class MonomialWithCoef:
+    __slots__ = ("coef", "monomial")
+    
     def __init__(self, coef: Scalar, monomial: Monomial):
         self.coef = coef
         self.monomial = monomial
@@ -0,0 +1,52 @@
+from __future__ import annotations
+from .monomial import *
+from typing import Iterable
+import itertools
+
+
+def minimal_monomials(monomials: Iterable[Monomial]) -> List[Monomial]:
+    """minimal generators of the ideal generated by the given monomials"""
+    minimal: List[Monomial] = []
+    for m in sorted(set(monomials), key=lambda m: m.total_degree()):
+        if not any(m.is_multiple(g) for g in minimal):
+            minimal.append(m)
+    return minimal
+
+
+def standard_monomials(gens: List[Monomial], symbols: List[Symbol]) -> List[Monomial]:
+    """
+    monomials outside the monomial ideal generated by gens (its staircase), which must be finite.
+    Every monomial is reached once, from the monomial obtained by lowering the exponent of its last variable.
+    """
+    ctx = SymbolContext.get(symbols)
+    n = len(ctx.symbols)
+    one = Monomial.one(ctx)
+    if any(one.is_multiple(g) for g in gens):
+        return []
+    staircase = []
+    stack = [(one, 0)]  # monomial, index of its last variable
+    while stack:
+        m, last = stack.pop()
+        staircase.append(m)
+        for i in range(last, n):
+            degrees = list(m.degrees)
+            degrees[i] += 1
+            child = Monomial._make(ctx, tuple(degrees), m.total_degree()+1)
+            if not any(child.is_multiple(g) for g in gens):
+                stack.append((child, i))
+    return staircase
+
+
+def canonical_exponents(exponent_sets: List[Iterable[Tuple[int, ...]]]) -> Tuple[Tuple[Tuple[Tuple[int, ...], ...], ...], int]:
+    """
+    canonical form of a list of sets of exponents (e.g. the minimal generators or the staircases of monomial ideals)
+    under the symmetric group permuting the variables, the same permutation acting on every set:
+    the smallest, in lexicographic order, of the sorted images. Also returns the size of the orbit (d! over the order of the stabilizer)
+    """
+    exponent_sets = [list(exponents) for exponents in exponent_sets]
+    d = next((len(e) for exponents in exponent_sets for e in exponents), 0)
+    images = {
+        tuple(tuple(sorted(tuple(e[i] for i in sigma) for e in exponents)) for exponents in exponent_sets)
+        for sigma in itertools.permutations(range(d))
+    }
+    return min(images), len(images)
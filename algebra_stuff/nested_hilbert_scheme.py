@@ -1,6 +1,7 @@
 from __future__ import annotations
 from .hilbert_scheme import *
-from typing import Tuple
+import bisect
+from typing import Optional, Tuple
 
 
 class YoungDiagramIdeals:
@@ -37,7 +38,7 @@ class YoungDiagramIdeals:
         degree = -np.ones((len(self.rows()), max_length), dtype=np.int16)
         for i, row in enumerate(self.rows()):
             for j, I in enumerate(row):
-                degree[i, j] = len(I.degree())
+                degree[i, j] = I.colength()
         return degree
 
     def _compute_socle(self) -> List[Tuple[int, int]]:
@@ -91,6 +92,15 @@ class YoungDiagramIdeals:
         """convert index (i, j) to the corresponding index if all the rows were concatenated"""
         return sum(len(self.nested_ideals[k]) for k in range(i)) + j
     
+    def canonical_form(self) -> Tuple[Tuple[Tuple[Tuple[int, ...], ...], ...], int]:
+        """
+        for monomial ideals, the exponents of the minimal generators of every ideal (rows concatenated) in a canonical form
+        under permutations of the variables acting on all of them at once, and the size of the orbit (see canonical_exponents)
+        """
+        if not all(I.is_monomial for I in self):
+            raise ValueError("only configurations of monomial ideals have a canonical form under permutations of the variables")
+        return canonical_exponents([[f.lm.degrees for f in I.groebner_basis] for I in self])
+    
     def dim_at(self):
         """dimension of the Hilbert scheme at the point represented by this object"""
         d = sum(self.degree[ind] for ind in self.socle) - sum(self.degree[ind] for ind in self.subsocle)
@@ -138,13 +148,29 @@ class DoubleNestedHilbertScheme:
             raise NotImplementedError("dimension of Nested Hilbert Scheme of Points is only implemented for curves")
         return point.dim_at()
     
-    def tangent_space(self, nested_ideals: Union[YoungDiagramIdeals, List[List[PolyRingIdeal]]], use_scipy: bool = True) -> DoubleNestedHilbertSchemeTangentSpace:
+    def tangent_space(self, nested_ideals: Union[YoungDiagramIdeals, List[List[PolyRingIdeal]]], use_scipy: bool = True, char: int = 0, streaming: bool = False) -> DoubleNestedHilbertSchemeTangentSpace:
         if isinstance(nested_ideals, YoungDiagramIdeals):
-            return DoubleNestedHilbertSchemeTangentSpace(self, nested_ideals, use_scipy=use_scipy)
+            return DoubleNestedHilbertSchemeTangentSpace(self, nested_ideals, use_scipy=use_scipy, char=char, streaming=streaming)
         if isinstance(nested_ideals, list):
-            return DoubleNestedHilbertSchemeTangentSpace.from_ideal_list(self, nested_ideals, use_scipy=use_scipy)
+            return DoubleNestedHilbertSchemeTangentSpace.from_ideal_list(self, nested_ideals, use_scipy=use_scipy, char=char, streaming=streaming)
         raise TypeError
     
+    def tangent_dim(self, point: YoungDiagramIdeals, use_scipy: bool = True, char: int = 0) -> int:
+        """
+        dimension of the tangent space at the point. For monomial ideals it only depends on the orbit of the point under
+        permutations of the variables: it is cached in IDEAL_CACHE under its canonical form (see YoungDiagramIdeals.canonical_form)
+        """
+        if not all(I.is_monomial for I in point):
+            return self.tangent_space(point, use_scipy=use_scipy, char=char).dim()
+        canonical, _ = point.canonical_form()
+        key = IdealCache.make_key("nested_tangent_dim", self.R.n, tuple(self.diagram), canonical)
+        field = f"dim_char_{char}"
+        dim = IDEAL_CACHE.get(key, field)
+        if dim is None:
+            dim = self.tangent_space(point, use_scipy=use_scipy, char=char).dim()
+            IDEAL_CACHE.set(key, field, dim)
+        return dim
+    
     def smooth_at(self, point: YoungDiagramIdeals) -> bool:
         T = self.tangent_space(point)
         return self.dim_at(point) == T.dim()
@@ -227,41 +253,61 @@ class DoubleNestedHilbertScheme:
 
 
 class DoubleNestedHilbertSchemeTangentSpace:
-    def __init__(self, base: DoubleNestedHilbertScheme, diagram_ideals: YoungDiagramIdeals, use_scipy: bool = True):
+    def __init__(self, base: DoubleNestedHilbertScheme, diagram_ideals: YoungDiagramIdeals, use_scipy: bool = True, char: int = 0, streaming: bool = False):
         """
         The shape of the nested_ideals list must coincide with the space's diagram
+        char: 0, or a prime to compute the dimension and basis exactly modulo this prime (see HomSpace)
+        streaming: never assemble the constraint matrix, its blocks are generated one at a time and fed to
+        an incremental echelon form (see _row_space), so that memory grows with the rank instead of the number of constraints
         """
         if base.diagram != diagram_ideals.diagram:
             raise ValueError
+        check_characteristic(char)
         self.base = base
         self.use_scipy = use_scipy
+        self.char = char
+        self.dtype = "int64" if char > 0 else decide_dtype(use_scipy)
+        self.streaming = streaming
         self.diagram_ideals = diagram_ideals
-        self.constraint_sizes: List[int] = []
-        self.constraints = self._compute_constraints()
+        # quotient ring R//I, modules I/I² and R/I of each cell (indexed as in diagram_ideals.index_mapping), built once
+        # and shared by the morphism constraints of the cell and the inclusion constraints of its neighbours
+        self.cells: List[HilbertSchemeTangentSpace] = [
+            HilbertScheme(self.base.R).tangent_space(I, use_scipy=self.use_scipy, char=self.char, precompute_constraints=False)
+            for I in self.diagram_ideals
+        ]
+        self.constraint_sizes: List[int] = [T.J.dim * T.O.dim for T in self.cells]
+        if streaming:
+            self.constraints = None
+            self.row_space = None
+        else:
+            self.constraints = self._compute_constraints()
     
     @classmethod
-    def from_ideal_list(cls, base: DoubleNestedHilbertScheme, nested_ideals: List[List[PolyRingIdeal]], use_scipy: bool = True):
+    def from_ideal_list(cls, base: DoubleNestedHilbertScheme, nested_ideals: List[List[PolyRingIdeal]], use_scipy: bool = True, char: int = 0, streaming: bool = False):
         diagram_ideals = YoungDiagramIdeals(base, nested_ideals, base.R)
-        return cls(base, diagram_ideals, use_scipy=use_scipy)
+        return cls(base, diagram_ideals, use_scipy=use_scipy, char=char, streaming=streaming)
     
     @staticmethod
-    def _nested_hom_constraints(I1: PolyRingIdeal = None, I2: PolyRingIdeal = None, use_scipy: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    def _nested_hom_constraints(T1: HilbertSchemeTangentSpace, T2: HilbertSchemeTangentSpace, use_scipy: bool = True, char: int = 0) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Required: I₂ subset of I₁
+        Required: I₂ subset of I₁, given with their modules as the tangent spaces T₁ and T₂ at their cells
         Constraints for the morphisms I₁ -> O₁ and I₂ -> O₂ to respect the inclusion Z₁ -> Z₂,
         that is commutativity of the following diagram
         I₁ → I₂
         ↓    ↓
         O₁ → O₂
         
-        Returns the constraint in two separate matrices, to be glued later
+        Returns the constraint in two separate matrices, to be glued later (int64 residues modulo char if char > 0)
         """
-        dtype = decide_dtype(use_scipy)
-        nested_modules = get_nested_modules(I1, I2)
-        S, J1, J2, O1, O2 = nested_modules.components()
-        k, m1, m2, n1, n2 = nested_modules.dims()
-        phi = HomSpace(J2, J1, precompute_constraints=False, use_scipy=use_scipy).get_matrix_representation(lambda f: f)
-        psi = HomSpace(O2, O1, precompute_constraints=False, use_scipy=use_scipy).get_matrix_representation(lambda f: f)
+        dtype = "int64" if char > 0 else decide_dtype(use_scipy)
+        exact_dtype = decide_dtype(use_scipy and char == 0)    # exact representations to be reduced modulo char
+        J1, O1, J2, O2 = T1.J, T1.O, T2.J, T2.O
+        m1, m2, n1, n2 = J1.dim, J2.dim, O1.dim, O2.dim
+        # matrices of the inclusion I₂/I₂² -> I₁/I₁² and of the projection R/I₂ -> R/I₁
+        phi = np.array([J1.to_basis(f) for f in J2.basis], dtype=exact_dtype).reshape((m2, m1)).T
+        psi = np.array([O1.to_basis(f) for f in O2.basis], dtype=exact_dtype).reshape((n2, n1)).T
+        if char > 0:
+            phi, psi = to_modular(phi, char), to_modular(psi, char)
         C1 = np.zeros((n1*m2, n1*m1), dtype=dtype)
         C2 = np.zeros((n1*m2, n2*m2), dtype=dtype)
         for i in range(n1):
@@ -269,93 +315,198 @@ class DoubleNestedHilbertSchemeTangentSpace:
                 ind = i*m2 + j
                 C1[ind, i*m1: i*m1+m1] += phi[:, j]
                 C2[ind, j: n2*m2 + j: m2] -= psi[i]
+        if char > 0:
+            C2 %= char
         return C1, C2
 
     def _zeros_before(self, ind):
         return sum(self.constraint_sizes[:ind])
     
-    def _zeros_after(self, ind):
-        return sum(self.constraint_sizes[ind+1:])
-    
     def _zeros_between(self, ind1, ind2):
         return sum(self.constraint_sizes[ind1+1:ind2])
     
-    def _morphism_constraints(self) -> np.ndarray:
+    def _morphism_constraints(self) -> List[np.ndarray]:
         """
-        Constraints for every map I -> O to be a morphism of R-modules.
-        Also updates the constraint_sizes attribute
+        Constraints for every map I -> O to be a morphism of R-modules, one block per ideal (on its own variables)
         """
-        morphism_constraints = []
-        for I in self.diagram_ideals:
-            C = HilbertScheme(self.base.R).tangent_space(I, use_scipy=self.use_scipy)._constraints()
-            morphism_constraints.append(C)
-            size = C.shape[1]
-            self.constraint_sizes.append(size)
-        
-        # padding with zeros
-        for ind, C in enumerate(morphism_constraints):
-            constraint_count = C.shape[0]
-            padding = lambda dim: np.zeros((constraint_count, dim), dtype=decide_dtype(self.use_scipy))
-            morphism_constraints[ind] = np.concatenate([padding(self._zeros_before(ind)), C, padding(self._zeros_after(ind))], axis=1)
-        C = np.concatenate(morphism_constraints, axis=0)
-        return C
+        return [T._constraints() for T in self.cells]
     
-    def _kernel_constraint(self, pos1: Tuple[int, int], pos2: Tuple[int, int]) -> np.ndarray:
+    def _kernel_constraint(self, pos1: Tuple[int, int], pos2: Tuple[int, int]) -> Tuple[int, np.ndarray, int, np.ndarray]:
         """
         Constraint for the morphisms corresponding I₁ -> O₁ and I₂ -> O₂ to respect the inclusion Z₁ -> Z₂
-        Basically a wrapper around _nested_hom_constraints glueing the constraints appropriately
+        Basically a wrapper around _nested_hom_constraints, returns the indices of both ideals with their blocks
         """
-        get_ideal_ind = lambda i, j: (self.diagram_ideals.index_mapping(i, j), self.diagram_ideals[i, j])
-        ind1, I1 = get_ideal_ind(*pos1)
-        ind2, I2 = get_ideal_ind(*pos2)
-        C1, C2 = self._nested_hom_constraints(I1, I2, use_scipy=self.use_scipy)
-        constraint_count = C1.shape[0]
-        
-        # padding with zeros
-        padding = lambda dim: np.zeros((constraint_count, dim), dtype=decide_dtype(self.use_scipy))
-        C = np.concatenate(
-            [
-                padding(self._zeros_before(ind1)),
-                C1,
-                padding(self._zeros_between(ind1, ind2)),
-                C2,
-                padding(self._zeros_after(ind2))
-            ],
-            axis=1
-        )
-        #filter_zero = lambda C: C[np.any(C, axis=1)]    # filter out some useless constraints
-        C = filter_zero(C)
-        return C
-
-    def _compute_constraints(self) -> np.ndarray:
-        morphism_constraints = self._morphism_constraints()
+        ind1 = self.diagram_ideals.index_mapping(*pos1)
+        ind2 = self.diagram_ideals.index_mapping(*pos2)
+        C1, C2 = self._nested_hom_constraints(self.cells[ind1], self.cells[ind2], use_scipy=self.use_scipy, char=self.char)
+        return ind1, C1, ind2, C2
 
-        row_constraints = []
+    def _inclusions(self) -> Iterator[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """positions of the pairs of neighbouring ideals in the diagram, along the rows then along the columns"""
         for i, row in enumerate(self.diagram_ideals.rows()):
             for j in range(len(row)-1):
-                C = self._kernel_constraint((i, j), (i, j+1))
-                row_constraints.append(C)
-        
-        column_constraints = []
+                yield (i, j), (i, j+1)
         for j, column in enumerate(self.diagram_ideals.columns()):
             for i in range(len(column)-1):
-                C = self._kernel_constraint((i, j), (i+1, j))
-                column_constraints.append(C)
+                yield (i, j), (i+1, j)
+
+    def _compute_constraints(self) -> np.ndarray:
+        """
+        The constraints as a grid of blocks, one column of blocks per ideal of the diagram:
+        a block diagonal of morphism constraints, then one row of two blocks per inclusion.
+        Assembled with scipy.sparse.bmat (CSR, zero rows removed), or densely for the object dtype
+        """
+        morphism_constraints = self._morphism_constraints()
+        k = len(morphism_constraints)
+        blocks = []
+        for ind, C in enumerate(morphism_constraints):
+            block_row = [None]*k
+            block_row[ind] = C
+            blocks.append(block_row)
+        for pos1, pos2 in self._inclusions():
+            ind1, C1, ind2, C2 = self._kernel_constraint(pos1, pos2)
+            block_row = [None]*k
+            block_row[ind1] = C1
+            block_row[ind2] = C2
+            blocks.append(block_row)
         
-        constraints = [morphism_constraints] + row_constraints + column_constraints
-        C = np.concatenate(
-            constraints,
-            axis = 0
-        )
-        return C
+        if np.dtype(self.dtype) != object:
+            C = scipy.sparse.bmat(blocks, format="csr", dtype=self.dtype)
+            C.eliminate_zeros()
+            return C[C.getnnz(axis=1) > 0]
+        # object arrays are not supported by scipy.sparse: pad with zeros
+        for block_row in blocks:
+            constraint_count = next(C.shape[0] for C in block_row if C is not None)
+            for ind, size in enumerate(self.constraint_sizes):
+                if block_row[ind] is None:
+                    block_row[ind] = np.zeros((constraint_count, size), dtype=self.dtype)
+        return filter_zero(np.block(blocks))
     
-    def dim(self) -> int:
-        max_rank = sum(self.constraint_sizes)
+    def constraint_blocks(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        the constraints, as blocks of rows given by the index of their first nonzero column and their nonzero columns:
+        one block per ideal and per element of the base ring (or generator), then one per inclusion of neighbouring ideals
+        """
+        for ind, T in enumerate(self.cells):
+            for C in T.hom_space.constraint_blocks():
+                yield self._zeros_before(ind), C
+        for pos1, pos2 in self._inclusions():
+            ind1, C1, ind2, C2 = self._kernel_constraint(pos1, pos2)
+            between = self._zeros_between(ind1, ind2)
+            if np.dtype(self.dtype) == object:
+                C = np.concatenate([C1, np.zeros((C1.shape[0], between), dtype=self.dtype), C2], axis=1)
+            else:
+                C = scipy.sparse.hstack([C1, scipy.sparse.csr_matrix((C1.shape[0], between), dtype=self.dtype), C2], format="csr")
+            yield self._zeros_before(ind1), C
+    
+    def _new_row_space(self, n_columns: int) -> Union[ModularEchelon, OrthonormalRowSpace]:
+        if self.char > 0:
+            return ModularEchelon(n_columns, self.char)
+        if self.use_scipy:
+            return OrthonormalRowSpace(n_columns)
+        return ModularEchelon(n_columns, 0)
+    
+    def _row_space(self) -> Union[ModularEchelon, OrthonormalRowSpace]:
+        """
+        streaming mode: span of the constraints, accumulated block by block, exactly (modulo char, or over the rationals
+        without scipy) in a sparse echelon form, or numerically in an orthonormal basis
+        """
+        if self.row_space is None:
+            self.row_space = self._new_row_space(sum(self.constraint_sizes))
+            for offset, C in self.constraint_blocks():
+                self.row_space.add_matrix(C, offset)
+        return self.row_space
+    
+    def is_torus_fixed(self) -> bool:
+        return all(I.is_monomial for I in self.diagram_ideals)
+    
+    def weights(self) -> List[Tuple[int, ...]]:
+        """torus weights of the unknowns of every cell, in the order of the constraint columns (None if not torus fixed)"""
+        weights = [T.hom_space.weights() for T in self.cells]
+        if not self.is_torus_fixed() or any(w is None for w in weights):
+            return None
+        return [w for cell_weights in weights for w in cell_weights]
+    
+    def character(self, workers: int = None) -> Dict[Tuple[int, ...], int]:
+        """
+        for monomial ideals, dimension of the tangent space in each torus weight: the morphism and inclusion constraints
+        only relate unknowns of the same weight and are solved one weight block at a time (see weight_character),
+        in streaming mode with one row space per weight (workers is then ignored)
+        """
+        weights = self.weights()
+        if weights is None:
+            raise ValueError("the character is only defined at points given by monomial ideals")
+        if self.streaming:
+            return self._streaming_character(weights)
+        return weight_character(self.constraints, weights, char=self.char, workers=workers)
+    
+    def _streaming_character(self, weights: List[Tuple[int, ...]]) -> Dict[Tuple[int, ...], int]:
+        """
+        streaming mode: the blocks of constraint_blocks are split by weight as they are generated, and each weight block
+        is fed to the row space of its weight. The unknowns of a weight inside the contiguous columns of a block
+        are contiguous among all the unknowns of that weight, starting from the number of them before the block
+        """
+        columns: Dict[Tuple[int, ...], List[int]] = {}
+        for c, w in enumerate(weights):
+            columns.setdefault(tuple(w), []).append(c)
+        row_spaces = {w: self._new_row_space(len(cols)) for w, cols in columns.items()}
+        for offset, C in self.constraint_blocks():
+            for weight, _, block in weight_blocks(C, weights[offset: offset + C.shape[1]]):
+                if block.shape[0] > 0:
+                    row_spaces[weight].add_matrix(block, bisect.bisect_left(columns[weight], offset))
+        dims = {w: len(columns[w]) - row_space.rank for w, row_space in row_spaces.items()}
+        return {w: d for w, d in dims.items() if d > 0}
+    
+    def closed_form_dim(self) -> Optional[int]:
+        """
+        dimension of the tangent space when known without computation, None otherwise. The nested Hilbert scheme is smooth
+        - for a single row or column (a chain of subschemes) of A¹, of dimension the length of the largest subscheme,
+        - for a single cell of A² (the Hilbert scheme), of dimension 2n,
+        - for two cells of A² of lengths n and n+1, of dimension 2n+2
+        """
+        diagram = self.base.diagram
+        chain = len(diagram) == 1 or all(row_len == 1 for row_len in diagram)
+        n = int(self.diagram_ideals.degree.max())
+        lengths = sorted(int(d) for d in self.diagram_ideals.degree.flatten() if d >= 0)
+        if self.base.R.n == 1 and chain:
+            return n
+        if self.base.R.n == 2 and len(lengths) == 1:
+            return 2*n
+        if self.base.R.n == 2 and len(lengths) == 2 and lengths[1] == lengths[0] + 1:
+            return 2*n
+        return None
+    
+    def dim(self, check: bool = False) -> int:
+        """
+        the closed form dimension when there is one (see closed_form_dim), the rank of the constraints otherwise.
+        check: also compute the rank, and raise a ValueError if the results differ
+        """
+        d = self.closed_form_dim()
+        if d is None:
+            return self._computed_dim()
+        if check and d != self._computed_dim():
+            raise ValueError(f"the closed form dimension {d} differs from the computed one")
+        return d
+    
+    def _computed_dim(self) -> int:
+        max_rank = int(sum(self.constraint_sizes))
+        if self.streaming:
+            return max_rank - self._row_space().rank
+        if self.weights() is not None:
+            return int(sum(self.character().values()))
+        if self.char > 0:
+            return max_rank - modular_rank(self.constraints, self.char)
         C = self.constraints if self.use_scipy else self.constraints.astype("float64")
-        rank = (np.linalg.matrix_rank(C) if C.size > 0 else 0)
-        return max_rank - rank
+        return max_rank - matrix_rank(C)
     
     def basis(self) -> np.ndarray:
+        if self.streaming:
+            basis = self._row_space().null_space()
+            if not self.use_scipy and self.char == 0 and Scalar.MODE != Scalar.FRACTION:
+                basis = basis.astype("float64")
+            return basis
+        if self.char > 0:
+            return modular_null_space(self.constraints, self.char)
         if self.use_scipy:
             return null_space(self.constraints)
         else:
@@ -1,6 +1,10 @@
 from __future__ import annotations
-from .groebner_polynomial import *
-from typing import TYPE_CHECKING
+from .f4 import *
+from .monomial_ideal import *
+from .cache import *
+from .fglm_conversion import *
+from typing import TYPE_CHECKING, Callable
+import numpy as np
 import algebra_stuff.module as module   # real import
 if TYPE_CHECKING:   # fake import, only for annotations
     from .module import QuotientRing, RingQuotientModule, IdealQuotientModule
@@ -20,12 +24,23 @@ class PolyRing:
             symbols = sympy.symbols(s_symbols)
             if n == 1:
                 symbols = [symbols]
-        self.symbols = symbols[: n]
+        self.symbols = tuple(symbols[: n])
+        self.symbol_context = SymbolContext.get(self.symbols)
         self.order = order
+        self._order_rings: Dict[str, PolyRing] = {}
         focus_poly_ring(self)
         if make_symbols_global_vars:
             self._make_symbols_global_vars()
     
+    def with_order(self, order: MonomialOrder) -> PolyRing:
+        """the same ring with another monomial order (the focus stays on this ring)"""
+        if repr(order) == repr(self.order):
+            return self
+        if repr(order) not in self._order_rings:
+            self._order_rings[repr(order)] = PolyRing(self.base, self.n, order, self.symbols, make_symbols_global_vars=False)
+            focus_poly_ring(self)
+        return self._order_rings[repr(order)]
+    
     def _make_symbols_global_vars(self, verbose: bool = True):
         # convenient but very dirty and potentially dangerous
         # TODO: doesn't work outside of the module's work
@@ -34,10 +49,10 @@ class PolyRing:
             get_global_scope()[symbol.name] = symbol
     
     def sort_list(self, l: List[GroebnerPolynomial]) -> List[GroebnerPolynomial]:
-        return sorted(l, key=lambda f: self.order.eval(f.lm), reverse=True)
+        return sorted(l, key=lambda f: self.order.key(f.lm), reverse=True)
         
-    def ideal(self, *gens: GroebnerPolynomial) -> PolyRingIdeal:
-        return PolyRingIdeal(self, gens)
+    def ideal(self, *gens: GroebnerPolynomial, engine: str = "buchberger") -> PolyRingIdeal:
+        return PolyRingIdeal(self, gens, engine=engine)
     
     def max_ideal(self):
         # give the ideal (x1, ..., xn)
@@ -65,27 +80,84 @@ class PolyRing:
 
 
 class PolyRingIdeal:
-    # TODO: bug: error when 0 is given as a generator
-    
-    def __init__(self, base: PolyRing, gens: List[GroebnerPolynomial]):
+    ENGINES = ("buchberger", "f4")
+    
+    def __init__(self, base: PolyRing, gens: List[GroebnerPolynomial], engine: str = "buchberger", known_basis: List[GroebnerPolynomial] = None):
+        """
+        engine: algorithm computing the Groebner basis, "buchberger" or "f4" (Macaulay matrices, better with many generators)
+        known_basis: optional Groebner basis of a subideal (e.g. the reduced basis of an ideal being extended),
+        critical pairs between its elements are not processed again
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"unknown Groebner basis engine '{engine}', expected one of {self.ENGINES}")
         self.base = base
         self.symbols = base.symbols
         self.order = base.order
+        self.engine = engine
         self.gens = [GroebnerPolynomial.make(poly, order=self.order, symbols=self.symbols) for poly in gens]
+        self.is_monomial = all(len(f) <= 1 for f in self.gens)
         self.groebner_basis: List[GroebnerPolynomial] = None
-        self._compute_groebner_basis()
+        self.buchberger_stats = BuchbergerStats()
+        self._cache_key: str = None
+        self.from_cache = False
+        self._staircase: List[Monomial] = None
+        self._staircase_index: Dict[Monomial, int] = None
+        self._quotient_basis: List[GroebnerPolynomial] = None
+        self._multiplication_matrices: List[np.ndarray] = None
+        self._normal_forms: Dict[Monomial, np.ndarray] = {}   # coordinates of the normal forms of non standard monomials
+        self._vectors: Dict[str, List[List[GroebnerPolynomial]]] = {}  # syzygies and cofactors, see _cached_vectors
+        self._compute_groebner_basis(known_basis)
+    
+    def cache_key(self) -> str:
+        """canonical key of the ideal in IDEAL_CACHE, from the ring, the order, the scalar mode and the generators"""
+        if self._cache_key is None:
+            gens = sorted(repr(poly_to_data(f)) for f in self.gens if not f.is_zero())
+            self._cache_key = IdealCache.make_key(
+                "ideal", repr(self.base.base), tuple(s.name for s in self.symbols), repr(self.order), Scalar.MODE, tuple(gens)
+            )
+        return self._cache_key
+    
+    def canonical_form(self) -> Tuple[Tuple[Tuple[int, ...], ...], int]:
+        """
+        for a monomial ideal, the exponents of its minimal generators in a canonical form under permutations of the variables,
+        and the size of its orbit (see canonical_exponents): ideals differing by a permutation of the variables have the same form
+        """
+        if not self.is_monomial:
+            raise ValueError("only monomial ideals have a canonical form under permutations of the variables")
+        (canonical,), orbit_size = canonical_exponents([[f.lm.degrees for f in self.groebner_basis]])
+        return canonical, orbit_size
     
     @ExecTimes.track_time
-    def _compute_groebner_basis(self):
-        ExecTimes.time_step("buchberger algo")
-        self.groebner_basis = self.buchberger_algo(self.gens)
+    def _compute_groebner_basis(self, known_basis: List[GroebnerPolynomial] = None):
+        ExecTimes.time_step("cache lookup")
+        cached = IDEAL_CACHE.get(self.cache_key(), "groebner_basis")
+        if cached is not None:
+            self.groebner_basis = [poly_from_data(data, self.symbols, self.order) for data in cached]
+            self.from_cache = True
+            return
+        self._run_groebner_basis(known_basis)
+        IDEAL_CACHE.set(self.cache_key(), "groebner_basis", [poly_to_data(f) for f in self.groebner_basis])
+    
+    def _run_groebner_basis(self, known_basis: List[GroebnerPolynomial] = None):
+        if self.is_monomial:
+            # the reduced Groebner basis of a monomial ideal is made of its minimal generators
+            ExecTimes.time_step("minimal monomial generators")
+            gens = {f.lm: f for f in self.gens if not f.is_zero()}
+            self.groebner_basis = self.sort_list([gens[m].to_monic() for m in minimal_monomials(gens)])
+            return
+        if self.engine == "f4":
+            ExecTimes.time_step("f4 algo")
+            self.groebner_basis = self.f4_algo(self.gens, stats=self.buchberger_stats, known_basis=known_basis)
+        else:
+            ExecTimes.time_step("buchberger algo")
+            self.groebner_basis = self.buchberger_algo(self.gens, stats=self.buchberger_stats, known_basis=known_basis)
         ExecTimes.time_step("basis reduce")
         self.groebner_basis = self.basis_reduce(self.groebner_basis)
         ExecTimes.time_step("basis sort")
         self.groebner_basis = self.sort_list(self.groebner_basis)
     
     def sort_list(self, l: List[GroebnerPolynomial]) -> List[GroebnerPolynomial]:
-        return sorted(l, key=lambda f: self.order.eval(f.lm), reverse=True)
+        return sorted(l, key=lambda f: self.order.key(f.lm), reverse=True)
     
     def contains(self, f: GroebnerPolynomial) -> bool:
         f = GroebnerPolynomial.make(f, order=self.order, symbols=self.symbols)
@@ -110,44 +182,63 @@ class PolyRingIdeal:
                     break
         return all(vars_represented)
     
+    def staircase(self) -> List[Monomial]:
+        """standard monomials of the quotient (monomials outside the leading ideal), sorted by decreasing order"""
+        if self._staircase is None:
+            if not self.has_max_radical():
+                raise ValueError("the ideal does not have finite finite colength")
+            cached = IDEAL_CACHE.get(self.cache_key(), "standard_monomials")
+            if cached is not None:
+                staircase = [Monomial(self.base.symbol_context, degrees) for degrees in cached]
+            else:
+                staircase = standard_monomials([f.lm for f in self.groebner_basis], self.symbols)
+                staircase.sort(key=self.order.key, reverse=True)
+                IDEAL_CACHE.set(self.cache_key(), "standard_monomials", [m.degrees for m in staircase])
+            self._staircase = staircase
+            self._staircase_index = {m: j for j, m in enumerate(staircase)}
+        return self._staircase
+    
+    def staircase_index(self) -> Dict[Monomial, int]:
+        """position of each standard monomial in staircase()"""
+        if self._staircase_index is None:
+            self.staircase()
+        return self._staircase_index
+    
     def degree(self) -> List[GroebnerPolynomial]:
         # TODO: find better name for this function + combine with degree_for_base function
-        if not self.has_max_radical():
-            raise ValueError("the ideal does not have finite finite colength")
-
-        def is_multiple(mon_degrees):
-            monomial = Monomial(self.symbols, mon_degrees)
-            for f in self.groebner_basis:
-                if monomial.is_multiple(f.lm):
-                    return True
-            quotient_gens.append(monomial)
-            return False
-        
-        quotient_gens = []
-        self._xplore_monomials(is_multiple)
-        quotient_gens = list(map(GroebnerPolynomial.make, quotient_gens))
-        quotient_gens = self.sort_list(quotient_gens)
-        return quotient_gens
-    
-    def _xplore_monomials(self, stop_operation, current_degrees=None, current=0, new=True):
-        if current_degrees is None:
-            current_degrees = [0]*len(self.symbols)
-        if new and stop_operation(current_degrees):
-            return
-        if current == len(current_degrees):
-            return
-        current_degrees[current] += 1
-        self._xplore_monomials(stop_operation, current_degrees, current, new=True)
-        current_degrees[current] -= 1
-        self._xplore_monomials(stop_operation, current_degrees, current+1, new=False)
+        if self._quotient_basis is None:
+            self._quotient_basis = [GroebnerPolynomial.make(m) for m in self.staircase()]
+        return list(self._quotient_basis)
+    
+    def _xplore_monomials(self, stop_operation: Callable[[List[int]], bool]):
+        # depth first enumeration of the monomials, the children of a monomial are not explored when stop_operation is True
+        # (each monomial is reached once, by raising the exponents of the variables in order)
+        n = len(self.symbols)
+        stack = [((0,)*n, 0, True)]
+        while stack:
+            degrees, current, new = stack.pop()
+            if new and stop_operation(list(degrees)):
+                continue
+            if current == n:
+                continue
+            stack.append((degrees, current+1, False))
+            stack.append((degrees[:current] + (degrees[current]+1,) + degrees[current+1:], current, True))
     
     def colength(self):
-        return len(self.degree())
+        return len(self.staircase())
     
     def degree_for_base(self, base_ideal: PolyRingIdeal) -> List[GroebnerPolynomial]:
         if not self.has_max_radical():
             raise ValueError("the ideal does not have finite finite colength")
-        
+        field = "basis_over_" + base_ideal.cache_key()
+        cached = IDEAL_CACHE.get(self.cache_key(), field)
+        if cached is not None:
+            return [poly_from_data(data, self.symbols, self.order) for data in cached]
+        quotient_gens = self._compute_degree_for_base(base_ideal)
+        IDEAL_CACHE.set(self.cache_key(), field, [poly_to_data(f) for f in quotient_gens])
+        return quotient_gens
+    
+    def _compute_degree_for_base(self, base_ideal: PolyRingIdeal) -> List[GroebnerPolynomial]:
         def is_mutliple(poly: GroebnerPolynomial):
             for f in self.groebner_basis:
                 if poly.lm.is_multiple(f.lm):
@@ -166,23 +257,200 @@ class PolyRingIdeal:
         quotient_gens = self.sort_list(quotient_gens)
         return quotient_gens
     
+    def _cached_vectors(self, field: str, compute: Callable[[], List[List[GroebnerPolynomial]]]) -> List[List[GroebnerPolynomial]]:
+        # lists of vectors of polynomials, computed once and stored on the ideal and in IDEAL_CACHE
+        if field not in self._vectors:
+            cached = IDEAL_CACHE.get(self.cache_key(), field)
+            if cached is not None:
+                vectors = [[poly_from_data(data, self.symbols, self.order) for data in v] for v in cached]
+            else:
+                vectors = compute()
+                IDEAL_CACHE.set(self.cache_key(), field, [[poly_to_data(f) for f in v] for v in vectors])
+            self._vectors[field] = vectors
+        return self._vectors[field]
+    
+    def _generators_key(self) -> str:
+        # the cache key does not depend on the order of the generators, the cofactors and syzygies on gens do
+        return IdealCache.make_key(*(repr(poly_to_data(f)) for f in self.gens))
+    
+    def groebner_syzygies(self) -> List[List[GroebnerPolynomial]]:
+        """generators of the syzygies of the Groebner basis, a[k] being the coefficient of groebner_basis[k] (see schreyer_syzygies)"""
+        return self._cached_vectors("groebner_syzygies", lambda: self.schreyer_syzygies(self.groebner_basis))
+    
+    def groebner_cofactors(self) -> List[List[GroebnerPolynomial]]:
+        """
+        for each element g of the Groebner basis, polynomials c with g = sum(c[k]*gens[k]).
+        The cofactors are tracked along a run of Buchberger's algorithm (see CofactorBuchberger, whichever the engine),
+        whose basis B then divides the reduced Groebner basis: the quotients express it in terms of B, hence of gens
+        """
+        def compute():
+            buchberger = CofactorBuchberger(self.order)
+            for f in self.gens:
+                buchberger.add_generator(f)
+            basis = buchberger.run()
+            basis_cofactors = buchberger.basis_cofactors()
+            cofactors = []
+            for g in self.groebner_basis:
+                quotients, _ = self.divide(g, basis)
+                cofactors.append([
+                    sum((q*c[k] for q, c in zip(quotients, basis_cofactors)), self.gens[k]*0) for k in range(len(self.gens))
+                ])
+            return cofactors
+        
+        if len(self.gens) == 0:
+            return [[] for _ in self.groebner_basis]
+        return self._cached_vectors("groebner_cofactors_" + self._generators_key(), compute)
+    
+    def syzygies(self) -> List[List[GroebnerPolynomial]]:
+        """
+        generators of the first syzygy module of gens, a[k] being the coefficient of gens[k] (sum(a[k]*gens[k]) = 0).
+        With G the Groebner basis, A its cofactors (G = AF, F = gens) and B the quotients of the division of F by G (F = BG),
+        they are the syzygies of G (Schreyer's theorem) multiplied by A and the rows of Id - BA. Zero vectors are left out
+        """
+        def compute():
+            G = self.groebner_basis
+            A = self.groebner_cofactors()
+            zero = self.gens[0]*0
+            combine = lambda a: [sum((a[i]*A[i][k] for i in range(len(G))), zero) for k in range(len(self.gens))]
+            syzygies = [combine(a) for a in self.groebner_syzygies()]
+            for j, f in enumerate(self.gens):
+                quotients, _ = self.divide(f, G)
+                syzygy = [-c for c in combine(quotients)]
+                syzygy[j] = syzygy[j] + 1
+                syzygies.append(syzygy)
+            return [syzygy for syzygy in syzygies if not all(a.is_zero() for a in syzygy)]
+        
+        if len(self.gens) == 0:
+            return []
+        return self._cached_vectors("syzygies_" + self._generators_key(), compute)
+    
     def reduced(self, f: GroebnerPolynomial):
         return self.reduce(f, self.groebner_basis)
     
     def to_quotient_basis(self, f: GroebnerPolynomial):
-        f = self.reduced(f)
-        basis = self.degree()
-        coefs = []
-        for g in basis:
-            c = 0
-            if f.lm.is_multiple(g.lm):
-                c = f.lc/g.lc
-                f = f - c*g
-            coefs.append(c)
-        if not f.is_zero():
-            print("NOT REDUCED ERROR", f)
+        f = GroebnerPolynomial.make(f, order=self.order, symbols=self.symbols)
+        f = self.total_reduce(f, self.groebner_basis)
+        index = self.staircase_index()
+        coefs = [0]*len(index)
+        for c, m in f.terms():
+            if m not in index:
+                print("NOT REDUCED ERROR", f)
+                continue
+            coefs[index[m]] = c
         return coefs
     
+    def coefficient_dtype(self):
+        """numpy dtype holding the coefficients of the normal forms: object for fractions, else float or complex"""
+        if Scalar.MODE == Scalar.FRACTION:
+            return object
+        if Scalar.MODE == Scalar.COMPLEX or any(isinstance(c, complex) for f in self.groebner_basis for c, _ in f.terms()):
+            return np.dtype("complex128")
+        return np.dtype("float64")
+    
+    def _zeros(self, shape) -> np.ndarray:
+        dtype = self.coefficient_dtype()
+        A = np.zeros(shape, dtype=dtype)
+        if dtype == object:
+            A[...] = Fraction(0)
+        return A
+    
+    def _variable_matrices(self) -> List[np.ndarray]:
+        if self._multiplication_matrices is not None:
+            return self._multiplication_matrices
+        field = f"multiplication_matrices_{np.dtype(self.coefficient_dtype())}"
+        matrices = IDEAL_CACHE.get(self.cache_key(), field)
+        if matrices is None:
+            staircase = self.staircase()
+            index = self.staircase_index()
+            matrices = []
+            for i in range(len(self.symbols)):
+                variable = Monomial(self.symbols, [int(k == i) for k in range(len(self.symbols))])
+                M = self._zeros((len(staircase), len(staircase)))
+                for j, m in enumerate(staircase):
+                    f = GroebnerPolynomial.make(m*variable, order=self.order, symbols=self.symbols)
+                    for c, mon in self.total_reduce(f, self.groebner_basis).terms():
+                        M[index[mon], j] = c
+                matrices.append(M)
+            IDEAL_CACHE.set(self.cache_key(), field, matrices)
+        self._multiplication_matrices = matrices
+        return matrices
+    
+    def multiplication_matrices(self) -> List[np.ndarray]:
+        """
+        matrices of the multiplication by each variable on the quotient, in the basis given by degree()
+        (column j holds the normal form of the variable times the j-th standard monomial)
+        """
+        return [M.copy() for M in self._variable_matrices()]
+    
+    def normal_form_vector(self, m: Monomial) -> np.ndarray:
+        """
+        coordinates of the normal form of the monomial m in the basis given by degree() (the returned array must not be modified).
+        m is brought back to a standard monomial (or a monomial seen before) by removing variables,
+        then the multiplication matrices of these variables are applied to its coordinates, no polynomial is reduced
+        """
+        index = self.staircase_index()
+        if len(index) == 0:
+            return self._zeros(0)
+        table = self._normal_forms
+        removed = []
+        while m not in table and m not in index:
+            i = next(i for i, d in enumerate(m.degrees) if d > 0)
+            degrees = m.degrees[:i] + (m.degrees[i]-1,) + m.degrees[i+1:]
+            removed.append(i)
+            m = Monomial._make(m.context, degrees, m.total_degree()-1)
+        if m in table:
+            v = table[m]
+        else:
+            v = self._zeros(self.colength())
+            v[index[m]] = 1
+        matrices = self._variable_matrices()
+        for i in reversed(removed):
+            degrees = m.degrees[:i] + (m.degrees[i]+1,) + m.degrees[i+1:]
+            m = Monomial._make(m.context, degrees, m.total_degree()+1)
+            support = np.nonzero(v != 0)[0]     # normal forms are sparse, only use the columns needed
+            v = matrices[i][:, support] @ v[support]
+            table[m] = v
+        return v
+    
+    def coordinates(self, f: GroebnerPolynomial, shift: Monomial = None) -> np.ndarray:
+        """coordinates of f (or of shift*f) in the quotient, in the basis given by degree()"""
+        index = self.staircase_index()
+        v = self._zeros(self.colength())
+        for c, m in f.terms():
+            if shift is not None:
+                m = m*shift
+            if m in index:
+                v[index[m]] += c
+            else:
+                v += c*self.normal_form_vector(m)
+        return v
+    
+    def action_tensor(self, multipliers: List[Monomial], elements: List[GroebnerPolynomial]) -> np.ndarray:
+        """tensor T of shape (len(multipliers), colength, len(elements)), T[a, :, b] are the coordinates of multipliers[a]*elements[b]"""
+        T = self._zeros((len(multipliers), len(elements), self.colength()))
+        for a, m in enumerate(multipliers):
+            for b, f in enumerate(elements):
+                T[a, b] = self.coordinates(f, shift=m)
+        return T.transpose((0, 2, 1))
+    
+    def fglm(self, order: MonomialOrder) -> PolyRingIdeal:
+        """
+        the same ideal, in the ring with the given monomial order, its Groebner basis being obtained by FGLM conversion
+        (linear algebra on the multiplication matrices of the quotient) rather than computed from scratch.
+        The ideal must have finite colength.
+        """
+        if not self.has_max_radical():
+            raise ValueError("FGLM conversion requires an ideal of finite colength")
+        ring = self.base.with_order(order)
+        if ring is self.base:
+            return self
+        if self.is_whole_ring():
+            return PolyRingIdeal(ring, [1], engine=self.engine)
+        G = fglm(self.staircase(), self._variable_matrices(), self.symbols, order)
+        G = ring.sort_list(G)
+        # the converted basis is passed as known basis, so that no critical pair is processed
+        return PolyRingIdeal(ring, G, engine=self.engine, known_basis=G)
+    
     def quotient_square_representation_matrix(self, g):
         pass
     
@@ -195,13 +463,13 @@ class PolyRingIdeal:
     
     @staticmethod
     def reduction_step(f: GroebnerPolynomial, g: GroebnerPolynomial) -> GroebnerPolynomial:
-        return f - f.lc/g.lc*f.lm/g.lm*g
+        return f.sub_term_multiple(f.lc/g.lc, f.lm/g.lm, g)
     
     @staticmethod
     def general_reduction_step(f: GroebnerPolynomial, g: GroebnerPolynomial, i: int = 0):
         c = f.get_coef(i)
         m = f.get_monomial(i)
-        return f - c/g.lc*m/g.lm*g
+        return f.sub_term_multiple(c/g.lc, m/g.lm, g)
     
     @staticmethod
     def reduce(f: GroebnerPolynomial, G: List[GroebnerPolynomial]) -> GroebnerPolynomial:
@@ -235,50 +503,88 @@ class PolyRingIdeal:
         return f
 
     @staticmethod
-    def buchberger_step(f: GroebnerPolynomial, g: GroebnerPolynomial, F: List[GroebnerPolynomial], new: List[GroebnerPolynomial]):
-        gcd = f.lm.gcd(g.lm)
-        S = 1/f.lc * g.lm / gcd * f - 1/g.lc * f.lm / gcd * g
-        S = PolyRingIdeal.reduce(S, F)
-        if not S.is_zero():
-            new.append(S)
-            
+    def divide(f: GroebnerPolynomial, G: List[GroebnerPolynomial]) -> Tuple[List[GroebnerPolynomial], GroebnerPolynomial]:
+        """
+        multivariate division of f by G: quotients q and remainder r with f = sum(q[k]*G[k]) + r,
+        no term of r being divisible by a leading monomial of G, and lm(q[k]*G[k]) <= lm(f)
+        """
+        quotients: List[Dict[Monomial, Scalar]] = [{} for _ in G]
+        remainder: Dict[Monomial, Scalar] = {}
+        while not f.is_zero():
+            c, m = f.lc, f.lm
+            for k, g in enumerate(G):
+                if m.is_multiple(g.lm):
+                    q, d = m/g.lm, c/g.lc
+                    quotients[k][q] = quotients[k].get(q, 0) + d
+                    f = f.sub_term_multiple(d, q, g)
+                    break
+            else:
+                remainder[m] = c
+                f = f - GroebnerPolynomial([MonomialWithCoef(c, m)], f.symbols, f.order)
+        make = lambda terms: GroebnerPolynomial([MonomialWithCoef(c, m) for m, c in terms.items()], f.symbols, f.order)
+        return [make(q) for q in quotients], make(remainder)
+
     @staticmethod
-    def buchberger_algo(F: List[GroebnerPolynomial]):
-        done = False
-        G = F
-        old = []
-        new = F
-        while not done:
-            G = old + new
-            next_new = []
-            for f in old:
-                for g in new:
-                    PolyRingIdeal.buchberger_step(f, g, G, next_new)
-            for i in range(len(new)-1):
-                for j in range(i+1, len(new)):
-                    f, g = new[i], new[j]
-                    PolyRingIdeal.buchberger_step(f, g, G, next_new)
-            done = len(next_new) == 0
-            old = G
-            new = list(set(next_new))
-        return G
+    def schreyer_syzygies(G: List[GroebnerPolynomial]) -> List[List[GroebnerPolynomial]]:
+        """
+        generators of the module of syzygies of the Groebner basis G (Schreyer's theorem), as coefficient vectors
+        (a[k] the coefficient of G[k], sum(a[k]*G[k]) = 0): for each critical pair (i, j), the S-polynomial of G[i] and G[j] minus
+        its standard representation given by divide. The pairs are those a Buchberger engine keeps when G is added to it:
+        the pairs pruned by the Gebauer-Möller chain criteria have syzygies combinations of the others,
+        but the product criterion is off (see Buchberger)
+        """
+        if len(G) < 2:
+            return []
+        pairs = Buchberger(G[0].order, strategy="normal", product_criterion=False)
+        for g in G:
+            pairs.add(g)
+        syzygies = []
+        for pair in sorted(pairs.queue.pairs(), key=lambda pair: (pair.i, pair.j)):
+            i, j, lcm = pair.i, pair.j, pair.lcm
+            f, g = G[i], G[j]
+            syzygy, _ = PolyRingIdeal.divide(pairs.s_polynomial(pair), G)
+            syzygy = [-q for q in syzygy]
+            syzygy[i] = syzygy[i] + GroebnerPolynomial([MonomialWithCoef(1/f.lc, lcm/f.lm)], f.symbols, f.order)
+            syzygy[j] = syzygy[j] - GroebnerPolynomial([MonomialWithCoef(1/g.lc, lcm/g.lm)], f.symbols, f.order)
+            syzygies.append(syzygy)
+        return syzygies
+
+    @staticmethod
+    def _run_engine(engine: Buchberger, F: List[GroebnerPolynomial], known_basis: List[GroebnerPolynomial] = None) -> List[GroebnerPolynomial]:
+        if known_basis is not None:
+            engine.add_groebner_basis(known_basis)
+        for f in F:
+            engine.add_generator(f)
+        return engine.run()
+    
+    @staticmethod
+    def buchberger_algo(F: List[GroebnerPolynomial], strategy: str = "sugar", stats: BuchbergerStats = None, known_basis: List[GroebnerPolynomial] = None) -> List[GroebnerPolynomial]:
+        polys = F if known_basis is None else known_basis + F
+        if len(polys) == 0:
+            return []
+        buchberger = Buchberger(polys[0].order, strategy=strategy, stats=stats)
+        return PolyRingIdeal._run_engine(buchberger, F, known_basis)
+    
+    @staticmethod
+    def f4_algo(F: List[GroebnerPolynomial], stats: BuchbergerStats = None, known_basis: List[GroebnerPolynomial] = None) -> List[GroebnerPolynomial]:
+        polys = F if known_basis is None else known_basis + F
+        if len(polys) == 0:
+            return []
+        f4 = F4(polys[0].order, stats=stats)
+        return PolyRingIdeal._run_engine(f4, F, known_basis)
     
     @staticmethod
     def basis_minimize(G: List[GroebnerPolynomial]):
-        for i, f in enumerate(G):
-            for j, g in enumerate(G):
-                if i != j and f.lm.is_multiple(g.lm):
-                    G.remove(f)
-                    return PolyRingIdeal.basis_minimize(G)
+        # drop the elements whose leading monomial is a strict multiple of another one, of equal leading monomials only the last is kept
+        PolyRingIdeal.basis_soft_minimize(G)
+        G[:] = [f for f in G if not any(g.lm != f.lm and f.lm.is_multiple(g.lm) for g in G)]
         return G
     
     @staticmethod
     def basis_soft_minimize(G: List[GroebnerPolynomial]):
-        for i, f in enumerate(G):
-            for j, g in enumerate(G):
-                if i != j and f.lm == g.lm:
-                    G.remove(f)
-                    return PolyRingIdeal.basis_soft_minimize(G)
+        # of the elements with equal leading monomials, only the last is kept
+        last = {f.lm: i for i, f in enumerate(G)}
+        G[:] = [f for i, f in enumerate(G) if last[f.lm] == i]
         return G
             
     @staticmethod
@@ -299,21 +605,55 @@ class PolyRingIdeal:
             raise TypeError
         return self.groebner_basis == other.groebner_basis
 
+    @staticmethod
+    def prune_term_multiples(F: List[GroebnerPolynomial]) -> List[GroebnerPolynomial]:
+        """
+        drop the polynomials of F that are a term c*m times another one (they are redundant as generators), and the zeros.
+        Polynomials equal up to a term have the same shape (exponents and coefficients relative to the leading term),
+        within a shape only the minimal leading monomials are kept (for monomials, these are the minimal generators)
+        """
+        shapes: Dict[tuple, Dict[Monomial, GroebnerPolynomial]] = {}
+        for f in F:
+            if f.is_zero():
+                continue
+            lm, lc = f.lm, f.lc
+            shape = tuple((tuple(a - b for a, b in zip(m.degrees, lm.degrees)), c/lc) for c, m in f.terms())
+            shapes.setdefault(shape, {}).setdefault(lm, f)
+        return [polys[m] for polys in shapes.values() for m in minimal_monomials(polys)]
+    
+    def _product_generators(self, gens: List[GroebnerPolynomial]) -> List[GroebnerPolynomial]:
+        # products of the given polynomials with the Groebner basis, the redundant ones being dropped before any Groebner basis computation
+        return self.prune_term_multiples([f*g for f in gens for g in self.groebner_basis])
+    
     def __pow__(self, d: int):
-        def prod(set):
-            p = 1
-            for g in set:
-                p *= g
-            return p
-        gens = [prod(s) for s in choices(self.groebner_basis, d)]
-        return PolyRingIdeal(self.base, gens)
+        if d == 0:
+            return PolyRingIdeal(self.base, [1], engine=self.engine)
+        # one factor at a time on the generators only, a single Groebner basis is computed at the end
+        gens = self.groebner_basis
+        for _ in range(d-1):
+            gens = self._product_generators(gens)
+        return PolyRingIdeal(self.base, self.sort_list(gens)[::-1], engine=self.engine)
     
     def __mul__(self, other: PolyRingIdeal):
         if self.base != other.base:
             raise ValueError
-        #gens = [f*g for f in self.gens for g in other.gens]
-        gens = [f*g for f in self.groebner_basis for g in other.groebner_basis]
-        return PolyRingIdeal(self.base, gens)
+        gens = other._product_generators(self.groebner_basis)
+        return PolyRingIdeal(self.base, self.sort_list(gens)[::-1], engine=self.engine)
+    
+    def extend(self, *gens: GroebnerPolynomial) -> PolyRingIdeal:
+        """
+        the ideal generated by this ideal and the given polynomials,
+        only the critical pairs involving the new generators are processed
+        (the former generators reduce to zero against the known basis)
+        """
+        return PolyRingIdeal(self.base, self.gens + list(gens), engine=self.engine, known_basis=self.groebner_basis)
+    
+    def __add__(self, other: PolyRingIdeal) -> PolyRingIdeal:
+        if not isinstance(other, PolyRingIdeal):
+            raise TypeError
+        if self.base != other.base:
+            raise ValueError
+        return self.extend(*other.gens)
     
     def __truediv__(self, other: PolyRingIdeal) -> IdealQuotientModule:
         # TODO: implement some sanity checks (some alr implemented in IdealQuotientModule, maybe move them here)
@@ -341,6 +681,6 @@ def choices(S, size, start_index=0, current_choices=None):
         current_choices.pop()
 
 
-def ideal(*gens: GroebnerPolynomial) -> PolyRingIdeal:
+def ideal(*gens: GroebnerPolynomial, engine: str = "buchberger") -> PolyRingIdeal:
     poly_ring = infer_poly_ring()
-    return PolyRingIdeal(poly_ring, gens)
+    return PolyRingIdeal(poly_ring, gens, engine=engine)
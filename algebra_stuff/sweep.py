@@ -0,0 +1,209 @@
+from __future__ import annotations
+from .nested_hilbert_scheme import *
+import concurrent.futures
+import csv
+import json
+import os
+import time
+
+
+SWEEP_FIELDS = ("partition", "colength", "tangent_dim", "orbit_size", "time")
+_SWEEP_RINGS: Dict[int, PolyRing] = {}  # polynomial ring of each number of variables, per process
+
+
+def monomial_ideal_boxes(n: int, d: int) -> Iterator[Tuple[Tuple[int, ...], ...]]:
+    """
+    lazily enumerate the monomial ideals of colength n in d variables (the torus fixed points of Hilb^n(A^d)),
+    each given by its boxes: the exponents of its standard monomials, i.e. partitions of n for d = 2,
+    plane partitions for d = 3, solid partitions for d = 4.
+    The boxes are added in increasing graded lexicographic order, which extends the divisibility order,
+    so every set of boxes is reached exactly once (as the sorted list of its boxes)
+    """
+    if n < 0 or d < 1:
+        raise ValueError("the colength must be nonnegative and there must be at least one variable")
+    if n == 0:
+        yield ()
+        return
+    key = lambda box: (sum(box), box)
+    
+    def addable(boxes: set, box: Tuple[int, ...]) -> bool:
+        # all the boxes below it are there
+        return box not in boxes and all(box[i] == 0 or box[:i] + (box[i]-1,) + box[i+1:] in boxes for i in range(d))
+    
+    def extend(boxes: set, order: List[Tuple[int, ...]]) -> Iterator[Tuple[Tuple[int, ...], ...]]:
+        if len(order) == n:
+            yield tuple(order)
+            return
+        last = key(order[-1])
+        candidates = {b[:i] + (b[i]+1,) + b[i+1:] for b in order for i in range(d)}
+        for box in sorted((c for c in candidates if key(c) > last and addable(boxes, c)), key=key):
+            boxes.add(box)
+            order.append(box)
+            yield from extend(boxes, order)
+            order.pop()
+            boxes.remove(box)
+    
+    origin = (0,)*d
+    yield from extend({origin}, [origin])
+
+
+def is_canonical_boxes(boxes: Tuple[Tuple[int, ...], ...]) -> bool:
+    """whether the boxes are the canonical representative of their orbit under permutations of the variables (see canonical_exponents)"""
+    (canonical,), _ = canonical_exponents([boxes])
+    return tuple(sorted(boxes)) == canonical
+
+
+def boxes_to_partition(boxes: Tuple[Tuple[int, ...], ...]):
+    """
+    the (d-1)-dimensional partition of the boxes: nested lists of the heights along the last variable,
+    indexed by the exponents of the other ones (a partition for d = 2, a plane partition for d = 3, ...), the colength for d = 1
+    """
+    if len(boxes) == 0 or len(boxes[0]) == 1:
+        return len(boxes)
+    rows: Dict[int, List[Tuple[int, ...]]] = {}
+    for box in boxes:
+        rows.setdefault(box[0], []).append(box[1:])
+    return [boxes_to_partition(tuple(rows[i])) for i in range(len(rows))]
+
+
+def monomial_ideal_from_boxes(R: PolyRing, boxes: Tuple[Tuple[int, ...], ...]) -> PolyRingIdeal:
+    """the monomial ideal of R whose standard monomials have the given exponents (see monomial_ideal_boxes)"""
+    d = R.n
+    box_set = set(boxes)
+    outside = {b[:i] + (b[i]+1,) + b[i+1:] for b in box_set | {(0,)*d} for i in range(d)} | {(0,)*d}
+    gens = [Monomial(R.symbol_context, degrees) for degrees in outside - box_set]
+    return R.ideal(*[MonomialWithCoef(1, m) for m in minimal_monomials(gens)])
+
+
+def _sweep_ring(d: int) -> PolyRing:
+    if d not in _SWEEP_RINGS:
+        _SWEEP_RINGS[d] = PolyRing(n=d, make_symbols_global_vars=False)
+    return _SWEEP_RINGS[d]
+
+
+def tangent_dim_record(
+    boxes: Tuple[Tuple[int, ...], ...], d: int, method: str = "presentation", char: int = 0, check: bool = False, use_cache: bool = True
+) -> Dict:
+    """
+    record (see SWEEP_FIELDS) of the tangent space of Hilb^n(A^d) at the monomial ideal with the given boxes:
+    its partition, colength, dimension, the size of its orbit under permutations of the variables
+    and the time spent computing the dimension (top level, so that it can run in a process pool).
+    The dimension is cached under the canonical form of the ideal, unless check is set or use_cache is False,
+    and a cached dimension comes with the time of its original computation (see HilbertScheme.timed_tangent_dim):
+    the time does not depend on which points the process computed before
+    """
+    R = _sweep_ring(d)
+    I = monomial_ideal_from_boxes(R, boxes)
+    if check or not use_cache:
+        t0 = time.time()
+        dim = HilbertScheme(R).tangent_space(I, char=char, method=method).dim(check=check)
+        elapsed = time.time() - t0
+    else:
+        dim, elapsed = HilbertScheme(R).timed_tangent_dim(I, char=char, method=method)
+    _, orbit_size = canonical_exponents([boxes])
+    return {
+        "partition": boxes_to_partition(boxes), "colength": len(boxes), "tangent_dim": dim, "orbit_size": orbit_size, "time": elapsed
+    }
+
+
+class SweepOutput:
+    """
+    records written one per line to a JSONL file, or one per row to a CSV file (the partition being JSON encoded),
+    depending on the extension of the path. The partitions already in the file are skipped when resuming,
+    a last line cut by an interruption is discarded
+    """
+    FORMATS = (".jsonl", ".csv")
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.format = os.path.splitext(path)[1]
+        if self.format not in self.FORMATS:
+            raise ValueError(f"unknown output format '{self.format}', expected one of {self.FORMATS}")
+        self.done: set = set()
+    
+    @staticmethod
+    def partition_key(partition) -> str:
+        return json.dumps(partition, separators=(",", ":"))
+    
+    def _truncate_partial_line(self):
+        with open(self.path, "rb+") as file:
+            content = file.read()
+            if len(content) > 0 and not content.endswith(b"\n"):
+                file.truncate(content.rfind(b"\n") + 1)
+    
+    def load(self):
+        """
+        read the partitions already computed (the file is created if needed).
+        Raises ValueError if a CSV file does not have the columns SWEEP_FIELDS
+        """
+        if not os.path.exists(self.path):
+            with open(self.path, "w", newline="") as file:
+                if self.format == ".csv":
+                    csv.writer(file).writerow(SWEEP_FIELDS)
+            return
+        self._truncate_partial_line()
+        with open(self.path, newline="") as file:
+            if self.format == ".csv":
+                reader = csv.DictReader(file)
+                if reader.fieldnames is not None and tuple(reader.fieldnames) != SWEEP_FIELDS:
+                    raise ValueError(f"cannot resume {self.path}: its columns {reader.fieldnames} are not {list(SWEEP_FIELDS)}")
+                rows = (row["partition"] for row in reader)
+            else:
+                rows = (line for line in file if line.strip())
+            for row in rows:
+                partition = json.loads(row)
+                if self.format == ".jsonl":
+                    partition = partition["partition"]
+                self.done.add(self.partition_key(partition))
+    
+    def write(self, record: Dict):
+        with open(self.path, "a", newline="") as file:
+            if self.format == ".csv":
+                csv.writer(file).writerow([self.partition_key(record["partition"])] + [record[field] for field in SWEEP_FIELDS[1:]])
+            else:
+                file.write(json.dumps(record) + "\n")
+        self.done.add(self.partition_key(record["partition"]))
+
+
+def sweep_tangent_dims(
+    n: int, d: int, output: str = None, workers: int = None, method: str = "presentation", char: int = 0, check: bool = False,
+    symmetric: bool = False
+) -> List[Dict]:
+    """
+    tangent dimension of Hilb^n(A^d) at every torus fixed point (see monomial_ideal_boxes and tangent_dim_record).
+    The points are enumerated lazily, and computed in a pool of workers processes if workers is given
+    (with at most 4*workers tasks pending). Each record is appended to output (a .jsonl or .csv path, see SweepOutput)
+    as soon as it is computed, the points already in output are skipped. Returns the records computed by this call.
+    symmetric: only compute one point per orbit under permutations of the variables (the tangent dimension is the same
+    along an orbit), its record giving the orbit size: up to d! times fewer computations.
+    Otherwise every point is computed, without the cache of the dimension by orbit (see tangent_dim_record)
+    """
+    out = SweepOutput(output) if output is not None else None
+    if out is not None:
+        out.load()
+    points = (
+        boxes for boxes in monomial_ideal_boxes(n, d)
+        if (not symmetric or is_canonical_boxes(boxes)) and (out is None or SweepOutput.partition_key(boxes_to_partition(boxes)) not in out.done)
+    )
+    records = []
+    
+    def collect(record: Dict):
+        records.append(record)
+        if out is not None:
+            out.write(record)
+    
+    if workers is None:
+        for boxes in points:
+            collect(tangent_dim_record(boxes, d, method=method, char=char, check=check, use_cache=symmetric))
+        return records
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for boxes in points:
+            pending.add(pool.submit(tangent_dim_record, boxes, d, method=method, char=char, check=check, use_cache=symmetric))
+            if len(pending) >= 4*workers:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+        for future in concurrent.futures.as_completed(pending):
+            collect(future.result())
+    return records
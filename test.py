@@ -290,4 +290,113 @@ def speed_test(mode):
         focus_base_ring(focused_base_ring)
 
 
+def sort_key_speed_test(repeat: int = 20):
+    # micro-benchmark: sorting the monomials of the test ideal's square with the former tuple keys vs compiled integer keys
+    R = PolyRing(n=3, make_symbols_global_vars=False)
+    x, y, z = R.symbols
+    I = R.ideal(x**2, x*y**2, x*y*z, x*z**2, y**2*z**2, y*z**3, z**4, y**3-x*z)
+    monomials = [m for f in (I**2).groebner_basis for g in I.groebner_basis for m in (f*g).monomials]
+    monomials = [Monomial(R.symbols, list(m.monomial.degrees)) for m in monomials]    # fresh monomials, no cached keys
+    tuple_key = lambda m: (m.total_degree(), [-d for d in reversed(m.degrees)])
+    t0 = time.time()
+    for _ in range(repeat):
+        sorted(monomials, key=tuple_key, reverse=True)
+    t1 = time.time()
+    for _ in range(repeat):
+        sorted(monomials, key=degrevlex.key, reverse=True)
+    t2 = time.time()
+    print(f"{len(monomials)} monomials, {repeat} sorts")
+    print(f"tuple keys: {t1-t0} s")
+    print(f"integer keys: {t2-t1} s")
+
+
+def power_speed_test(max_degree: int = 4):
+    # benchmark: powers of the test ideal with the former generators (every multiset of Groebner basis elements
+    # multiplied out) vs the products pruned one factor at a time, the Groebner bases must agree
+    R = PolyRing(n=3, make_symbols_global_vars=False)
+    x, y, z = R.symbols
+    I = R.ideal(x**2, x*y**2, x*y*z, x*z**2, y**2*z**2, y*z**3, z**4, y**3-x*z)
+    
+    def prod(polys):
+        p = 1
+        for g in polys:
+            p *= g
+        return p
+    
+    for d in range(2, max_degree+1):
+        IDEAL_CACHE.clear()
+        t0 = time.time()
+        former = PolyRingIdeal(R, [prod(s) for s in choices(I.groebner_basis, d)])
+        t1 = time.time()
+        IDEAL_CACHE.clear()
+        power = I**d
+        t2 = time.time()
+        if former != power:
+            raise ValueError
+        print(f"I^{d}: {len(former.gens)} -> {len(power.gens)} generators, {len(power.groebner_basis)} in the Groebner basis")
+        print(f"former: {t1-t0} s ({former.buchberger_stats.pairs_created} pairs)")
+        print(f"pruned: {t2-t1} s ({power.buchberger_stats.pairs_created} pairs)")
+
+
+def fglm_check():
+    # over the rationals, the FGLM conversion of non-monomial ideals to lex must give the Groebner basis computed directly in lex
+    prev_mode = Scalar.MODE
+    Scalar.MODE = Scalar.FRACTION
+    try:
+        R = PolyRing(n=3, make_symbols_global_vars=False)
+        x, y, z = R.symbols
+        L = R.with_order(lex)
+        for gens in [(x**2+y*z-3, y**2-x+z, z**3-x*y+1), (x**2+y, y**2+z, z**3), (y**2-2*y, y*z-3*y, z**2-Fraction(3, 2)*y-2*z, x-Fraction(1, 4)*y-Fraction(1, 2)*z)]:
+            converted = R.ideal(*gens).fglm(lex)
+            direct = L.ideal(*[GroebnerPolynomial.make(g, order=lex, symbols=L.symbols) for g in gens])
+            if converted != direct:
+                raise ValueError
+            print(converted.groebner_basis[-1])
+    finally:
+        Scalar.MODE = prev_mode
+
+
+def generators_only_check():
+    # commuting with the variables only (generators_only) must give the same Hom space as commuting with the whole basis
+    # of the base ring: same dimension, and bases spanning the same space
+    R = PolyRing(n=3, make_symbols_global_vars=False)
+    x, y, z = R.symbols
+    ideals = [
+        R.ideal(x**2, x*y**2, x*y*z, x*z**2, y**2*z**2, y*z**3, z**4, y**3-x*z), R.ideal(y**2-z, x**2, x*z, y*z, z**2),
+        R.ideal(x, y, z)**2
+    ]
+    for I in ideals:
+        R//I
+        full = HomSpace(I/I**2, R/I)
+        generators = HomSpace(I/I**2, R/I, generators_only=True)
+        B_full, B_generators = full.basis(), generators.basis()
+        rank = np.linalg.matrix_rank(np.concatenate([B_full, B_generators], axis=1))
+        if full.dim() != generators.dim() or rank != B_full.shape[1] or rank != B_generators.shape[1]:
+            raise ValueError
+        print(f"dimension {full.dim()}: {full.constraints.shape[0]} constraints -> {generators.constraints.shape[0]}")
+
+
+def syzygy_check():
+    # the syzygies of the generators of non-monomial ideals must vanish on them, the cofactors must give the Groebner basis,
+    # and the tangent spaces from the generators' presentation, the Groebner basis' one and Hom(I/I^2, R/I) must agree
+    R = PolyRing(n=3, make_symbols_global_vars=False)
+    x, y, z = R.symbols
+    ideals = [
+        R.ideal(x*y, y*z, x*z, x**2-y**2, y**2-z**2), R.ideal(y**2-z, x**2, x*z, y*z, z**2),
+        R.ideal(x**3-y*z, y**2-x*z, z**2-x**2*y, x*y*z, x+y+z**2)
+    ]
+    for I in ideals:
+        zero = I.gens[0]*0
+        for a in I.syzygies():
+            if not sum((c*f for c, f in zip(a, I.gens)), zero).is_zero():
+                raise ValueError
+        for a, g in zip(I.groebner_cofactors(), I.groebner_basis):
+            if not (sum((c*f for c, f in zip(a, I.gens)), zero) - g).is_zero():
+                raise ValueError
+        R//I
+        dims = [PresentationHomSpace(I, R/I, groebner=False).dim(), PresentationHomSpace(I, R/I).dim(), HilbertScheme(R).tangent_space(I).dim()]
+        if len(set(dims)) != 1:
+            raise ValueError
+        print(f"{len(I.gens)} generators, {len(I.syzygies())} syzygies, tangent dimension {dims[0]}")
+
 I = ideal(y**2-2*y,y*z-3*y,z**2+Fraction(-3, 2)*y-2*z,x+Fraction(-1, 4)*y+Fraction(-1, 2)*z)